@@ -1,6 +1,6 @@
 # api_server.py
 # REST API for dashboard and tools
-from fastapi import FastAPI, Query, BackgroundTasks
+from fastapi import FastAPI, Query, Request, Response
 from typing import List, Optional
 import uvicorn
 import datetime
@@ -10,18 +10,29 @@ from sqlalchemy.orm import sessionmaker
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
-from db.db_models import Base, Job, Decision
+from db.db_models import Base, Job, Decision, DecisionRollup
+from services import slurm_poller
 from services.slurm_poller import poll_slurm
 from services.cpu_predictor import CPUPredictor
 from services.mem_predictor import MemPredictor
 from services.rl_scheduler import RLScheduler
 from services.simulator import simulate
+from services.metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, Histogram, MultiprocessMetrics
+from services.profiler import ProfilingController, MODES as PROFILING_MODES
+from services.decision_journal import DecisionJournal
+from services.history import history_bounds, history_granularity
+from services.pipeline import predict_and_decide
+from services.sharded_pipeline import ShardedPipeline
+from services.multiworker import LeaderLock, LeaderControl, run_when_leader, process_memory, child_pids
+from services.model_registry import ModelRegistry, ModelManager, KINDS as MODEL_KINDS, DEFAULT_ROOT as MODEL_REGISTRY_ROOT
 import logging
+import time
 from threading import Event
 from fastapi.openapi.utils import get_openapi
 
-# SQLite DB for simplicity
-DB_PATH = os.path.join(os.path.dirname(__file__), '../data/scheduler.db')
+# SQLite DB for simplicity; ADPS_DB_PATH points tools such as the benchmarks at a throwaway copy
+DB_PATH = os.environ.get('ADPS_DB_PATH') or os.path.join(os.path.dirname(__file__), '../data/scheduler.db')
+os.makedirs(os.path.dirname(os.path.abspath(DB_PATH)), exist_ok=True)
 engine = create_engine(f'sqlite:///{DB_PATH}')
 Session = sessionmaker(bind=engine)
 Base.metadata.create_all(engine)
@@ -31,75 +42,235 @@ app = FastAPI()
 cpu_predictor = CPUPredictor()
 mem_predictor = MemPredictor()
 rl_scheduler = RLScheduler()
+# Session is looked up at call time so tools that repoint it are honoured
+decision_journal = DecisionJournal(lambda: Session())
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("api_server")
 
 poll_stop_event = Event()
 
+def load_service_config():
+    try:
+        import yaml
+        config_path = os.path.join(os.path.dirname(__file__), '../config/service_config.yaml')
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                return yaml.safe_load(f) or {}
+    except Exception:
+        pass
+    return {}
+
+# --- Poller leader election across API workers ---
+poller_lock = LeaderLock(load_service_config().get(
+    'poller_lock_path', os.path.join(os.path.dirname(__file__), '../data/poller.lock')))
+# Poller state (replay, cycle profiling) lives in the leader; admin endpoints on other workers forward to it
+leader_control = LeaderControl(poller_lock)
+# Under the prefork server every worker dumps its metrics here so any worker can serve the totals
+multiprocess_metrics = MultiprocessMetrics(load_service_config().get(
+    'metrics_dir', os.path.join(os.path.dirname(__file__), '../data/metrics')))
+
+# --- Partition-sharded predict/decide workers (off unless enabled in config) ---
+SHARDING_CONFIG = load_service_config().get('sharding') or {}
+shard_pool = ShardedPipeline(
+    SHARDING_CONFIG.get('workers', 4),
+    process_timeout=SHARDING_CONFIG.get('timeout_sec', 60),
+    reload_timeout=SHARDING_CONFIG.get('reload_timeout_sec', 120),
+) if SHARDING_CONFIG.get('enabled') else None
+
+# --- Versioned model registry with hot swap (off unless enabled in config) ---
+MODEL_REGISTRY_CONFIG = load_service_config().get('model_registry') or {}
+
+def sample_jobs(n):
+    # Warm-up batch: the head of the loaded trace, or neutral placeholder jobs if none is loaded
+    feeder = slurm_poller.swf_feeder
+    if feeder is not None and feeder.jobs:
+        return [dict(job) for job in feeder.jobs[:n]]
+    return [{'job_id': i, 'user': 'warmup', 'state': 'PENDING', 'req_cpus': 1 + i % 16, 'req_mem_gb': 1.0 + i % 8,
+             'est_run_time': 600 * (1 + i % 6), 'submit_time': 1262304000 + 60 * i, 'partition': 'default'}
+            for i in range(n)]
+
+model_manager = ModelManager(
+    ModelRegistry(MODEL_REGISTRY_CONFIG.get('root', MODEL_REGISTRY_ROOT)),
+    {'cpu': cpu_predictor, 'mem': mem_predictor, 'rl': rl_scheduler},
+    sample_jobs,
+    max_latency_ms=MODEL_REGISTRY_CONFIG.get('max_latency_ms'),
+    warmup_batch=MODEL_REGISTRY_CONFIG.get('warmup_batch', 32),
+    # Only the leader starts the pool; elsewhere a swap just records the path the pool would start from
+    replicas=shard_pool,
+)
+
+# --- On-demand profiling (disarmed unless enabled in config or via /admin/profile) ---
+PROFILING_CONFIG = load_service_config().get('profiling') or {}
+profiler = ProfilingController(PROFILING_CONFIG.get(
+    'output_dir', os.path.join(os.path.dirname(__file__), '../profiling')))
+if PROFILING_CONFIG.get('enabled'):
+    profiler.arm(
+        cycles=PROFILING_CONFIG.get('cycles', 1),
+        requests=PROFILING_CONFIG.get('requests', 0),
+        mode=PROFILING_CONFIG.get('mode', 'sample'),
+        trace_memory=PROFILING_CONFIG.get('tracemalloc', False),
+        sample_interval_ms=PROFILING_CONFIG.get('sample_interval_ms', 5),
+    )
+
+# --- Metrics ---
+POLL_LATENCY = Histogram('adps_poll_seconds', 'Time spent polling SLURM for jobs')
+PREDICT_LATENCY = Histogram('adps_predict_seconds', 'Per-job prediction latency', ['predictor'])
+RL_DECIDE_LATENCY = Histogram('adps_rl_decide_seconds', 'RL scheduler decision latency per partition batch')
+DB_WRITE_LATENCY = Histogram('adps_db_write_seconds', 'Time spent storing a batch of jobs')
+CYCLE_LATENCY = Histogram('adps_cycle_seconds', 'Duration of a full update_job_queue cycle')
+CYCLES = Counter('adps_cycles_total', 'Poll cycles run')
+CYCLE_ERRORS = Counter('adps_cycle_errors_total', 'Poll cycles that raised an exception')
+CYCLE_OVERRUNS = Counter('adps_cycle_overruns_total', 'Poll cycles that took longer than the poll interval')
+JOBS_PROCESSED = Counter('adps_jobs_processed_total', 'Jobs passed through prediction and RL scheduling')
+JOBS_WRITTEN = Counter('adps_db_jobs_written_total', 'Job rows written, split into inserts and updates', ['op'])
+QUEUE_DEPTH = Gauge('adps_queue_depth', 'Pending jobs in the last polled batch')
+RL_ACTIONS = Counter('adps_rl_actions_total', 'RL scheduling actions taken', ['action'])
+DECISION_LATENCY = Histogram('adps_replay_decision_latency_seconds', 'Trace replay submit-to-decision latency')
+REPLAY_DROPPED_CYCLES = Counter('adps_replay_dropped_cycles_total', 'Replay poll ticks skipped because a cycle overran')
+HTTP_LATENCY = Histogram('adps_http_request_seconds', 'HTTP request latency', ['method', 'path', 'status'])
+
 # --- Helper: Poll SLURM, predict, RL, store jobs ---
 def update_job_queue():
+    cycle_start = time.perf_counter()
+    CYCLES.inc()
+    replay = slurm_poller.replay_feeder
+    jobs, stored = [], False
     try:
-        jobs = poll_slurm()
+        with POLL_LATENCY.time():
+            jobs = poll_slurm()
         session = Session()
-        for job in jobs:
-            job = cpu_predictor.predict(job)
-            if not job.get('pred_cpu_cores'):
-                job['pred_cpu_cores'] = job.get('req_cpus', 0)
-            job = mem_predictor.predict(job)
-            if not job.get('pred_mem_gb'):
-                job['pred_mem_gb'] = job.get('req_mem_gb', 0)
-        jobs = rl_scheduler.decide(jobs, cluster_state=None)
+        # Only pending jobs are scheduled; started or finished ones (from the SLURM adapter) just update their state
+        pending = [job for job in jobs if job.get('state') == 'PENDING']
+        others = [job for job in jobs if job.get('state') != 'PENDING']
+        QUEUE_DEPTH.set(len(pending))
+        if not pending:
+            timings = {'cpu': [], 'mem': [], 'rl': []}
+        elif shard_pool is not None:
+            pending, timings = shard_pool.process(pending)
+        else:
+            pending, timings = predict_and_decide(pending, cpu_predictor, mem_predictor, rl_scheduler)
+        for latency in timings['cpu']:
+            PREDICT_LATENCY.observe(latency, predictor='cpu')
+        for latency in timings['mem']:
+            PREDICT_LATENCY.observe(latency, predictor='mem')
+        for latency in timings['rl']:
+            RL_DECIDE_LATENCY.observe(latency)
+        JOBS_PROCESSED.inc(len(pending))
         # Store/update jobs in DB
-        for job in jobs:
-            db_job = session.query(Job).filter_by(job_id=job['job_id']).first()
-            if not db_job:
-                db_job = Job(job_id=job['job_id'])
-            db_job.user = job['user']
-            db_job.req_cpus = job['req_cpus']
-            db_job.req_mem_gb = job['req_mem_gb']
-            db_job.pred_cpu_cores = job['pred_cpu_cores']
-            db_job.pred_mem_gb = job['pred_mem_gb']
-            db_job.state = job['state']
-            db_job.submit_time = datetime.datetime.now()  # Could parse from job['submit_time']
-            db_job.rl_action = job['rl_action']
-            db_job.partition = job.get('partition')
-            db_job.est_run_time = job.get('est_run_time')
-            session.merge(db_job)
-        session.commit()
+        with DB_WRITE_LATENCY.time():
+            for job in others:
+                db_job = session.query(Job).filter_by(job_id=job['job_id']).first()
+                if db_job:
+                    JOBS_WRITTEN.inc(op='update')
+                    db_job.state = job['state']
+                    continue
+                # First seen after it started (e.g. running at the first poll): store it without a decision
+                JOBS_WRITTEN.inc(op='insert')
+                session.add(Job(job_id=job['job_id'], user=job['user'], req_cpus=job['req_cpus'],
+                                req_mem_gb=job['req_mem_gb'], state=job['state'],
+                                submit_time=datetime.datetime.now(), partition=job.get('partition'),
+                                est_run_time=job.get('est_run_time')))
+            for job in pending:
+                db_job = session.query(Job).filter_by(job_id=job['job_id']).first()
+                if not db_job:
+                    db_job = Job(job_id=job['job_id'])
+                    JOBS_WRITTEN.inc(op='insert')
+                else:
+                    JOBS_WRITTEN.inc(op='update')
+                RL_ACTIONS.inc(action=job['rl_action'])
+                db_job.user = job['user']
+                db_job.req_cpus = job['req_cpus']
+                db_job.req_mem_gb = job['req_mem_gb']
+                db_job.pred_cpu_cores = job['pred_cpu_cores']
+                db_job.pred_mem_gb = job['pred_mem_gb']
+                db_job.state = job['state']
+                db_job.submit_time = datetime.datetime.now()  # Could parse from job['submit_time']
+                db_job.rl_action = job['rl_action']
+                db_job.partition = job.get('partition')
+                db_job.est_run_time = job.get('est_run_time')
+                session.merge(db_job)
+            session.commit()
+        stored = True
         session.close()
-        logger.info(f"Updated job queue with {len(jobs)} jobs.")
-        return jobs
+        slurm_poller.commit_poll()
+        decision_journal.record_cycle(pending, simulate(pending, cluster_state=None))
+        if replay is not None:
+            for latency in replay.record_decisions(pending):
+                DECISION_LATENCY.observe(latency)
+        logger.info(f"Updated job queue with {len(pending)} decided jobs and {len(others)} state changes.")
+        return pending + others
     except Exception as e:
-        logger.error(f"Error updating job queue: {e}")
+        CYCLE_ERRORS.inc()
+        if replay is not None and not stored:
+            # Replay jobs already taken off the backlog are never decided; once stored they were
+            replay.dropped_jobs += len(jobs)
+        logger.exception(f"Error updating job queue: {e}")
         return []
+    finally:
+        CYCLE_LATENCY.observe(time.perf_counter() - cycle_start)
 
 # --- Background polling using FastAPI BackgroundTasks ---
 def poller_thread():
-    import time
     from services.slurm_poller import USE_MOCK
-    interval = 5
-    try:
-        import yaml
-        config_path = os.path.join(os.path.dirname(__file__), '../config/service_config.yaml')
-        if os.path.exists(config_path):
-            with open(config_path) as f:
-                config = yaml.safe_load(f)
-            interval = config.get('poll_interval_sec', 5)
-    except Exception:
-        pass
+    config = load_service_config()
+    interval = config.get('poll_interval_sec', 5)
+    if (config.get('replay') or {}).get('enabled'):
+        slurm_poller.start_replay()
+    replay, next_tick = None, None
     while not poll_stop_event.is_set():
-        update_job_queue()
-        time.sleep(interval)
+        start = time.perf_counter()
+        if profiler.armed:
+            profiler.run('cycle', 'update_job_queue', update_job_queue)
+        else:
+            update_job_queue()
+        if time.perf_counter() - start > interval:
+            CYCLE_OVERRUNS.inc()
+        if slurm_poller.replay_feeder is None:
+            replay = None
+            time.sleep(interval)
+            continue
+        # Replay runs on fixed-rate ticks; ticks missed while a cycle overran are dropped, not queued
+        tick = slurm_poller.replay_feeder.tick_sec or interval
+        now = time.monotonic()
+        if replay is not slurm_poller.replay_feeder:
+            replay, next_tick = slurm_poller.replay_feeder, now
+        next_tick += tick
+        if now > next_tick:
+            missed = int((now - next_tick) // tick) + 1
+            replay.dropped_cycles += missed
+            REPLAY_DROPPED_CYCLES.inc(missed)
+            next_tick += missed * tick
+        poll_stop_event.wait(next_tick - now)
 
 @app.on_event("startup")
 def start_background_tasks():
+    decision_journal.start()
+    if os.environ.get('ADPS_WORKER_ID') is not None:
+        multiprocess_metrics.start()
+    if MODEL_REGISTRY_CONFIG.get('enabled'):
+        model_manager.sync_in_background()
+        model_manager.watch(MODEL_REGISTRY_CONFIG.get('watch_interval_sec', 10))
+    # Only one process (of however many API workers share this DB) runs the poller
+    run_when_leader(poller_lock, start_poller, poll_stop_event)
+
+def start_poller():
     import threading
+    leader_control.serve()
+    if shard_pool is not None:
+        shard_pool.start()
     threading.Thread(target=poller_thread, daemon=True).start()
 
 @app.on_event("shutdown")
 def stop_background_tasks():
     poll_stop_event.set()
+    model_manager.stop()
+    decision_journal.stop()
+    if shard_pool is not None:
+        shard_pool.close()
+    leader_control.close()
+    multiprocess_metrics.stop()
+    poller_lock.release()
 
 @app.get("/queue")
 def get_queue():
@@ -144,8 +315,40 @@ def get_rl_decisions():
     return {'jobs': job_dicts, 'metrics': metrics}
 
 @app.get("/history")
-def get_history(start: Optional[str] = Query(None), end: Optional[str] = Query(None)):
+def get_history(start: Optional[str] = Query(None), end: Optional[str] = Query(None),
+                granularity: str = Query('raw')):
+    try:
+        start, end = history_bounds(start, end)
+    except ValueError:
+        return {"error": "Invalid start or end, expected an ISO date or timestamp."}
+    if granularity == 'auto':
+        granularity = history_granularity(start, end)
+    if granularity not in ('raw', 'minute', 'hour'):
+        return {"error": "Invalid granularity, expected raw, minute, hour or auto."}
     session = Session()
+    if granularity != 'raw':
+        q = session.query(DecisionRollup).filter(DecisionRollup.granularity == granularity)
+        if start:
+            q = q.filter(DecisionRollup.bucket_start >= start)
+        if end:
+            q = q.filter(DecisionRollup.bucket_start <= end)
+        result = [
+            {
+                'timestamp': r.bucket_start,
+                'granularity': r.granularity,
+                'decisions': r.decisions,
+                'run_count': r.run_count,
+                'hold_count': r.hold_count,
+                'pre_util': r.pre_util_sum / r.decisions if r.decisions else None,
+                'post_util': r.post_util_sum / r.decisions if r.decisions else None,
+                # Mean end-of-cycle utilization; per-decision values depend on where a job fell in its cycle
+                'cycles': r.cycles,
+                'utilization': r.cycle_util_sum / r.cycles if r.cycles else None,
+                'avg_wait_time': r.wait_time_sum / r.decisions if r.decisions else None
+            } for r in q.order_by(DecisionRollup.bucket_start).all()
+        ]
+        session.close()
+        return result
     q = session.query(Decision)
     if start:
         q = q.filter(Decision.timestamp >= start)
@@ -158,7 +361,9 @@ def get_history(start: Optional[str] = Query(None), end: Optional[str] = Query(N
             'action': d.action,
             'timestamp': d.timestamp,
             'pre_util': d.pre_util,
-            'post_util': d.post_util
+            'post_util': d.post_util,
+            # Same key as the rollup rows so the dashboard can chart either
+            'utilization': d.post_util
         } for d in decisions
     ]
     session.close()
@@ -170,9 +375,26 @@ def override_decision(job_id: int, action: str):
     # Validate input
     if not isinstance(job_id, int) or not isinstance(action, str):
         return {"error": "Invalid input."}
-    # Log override as a decision
-    decision = Decision(job_id=job_id, action=action, timestamp=datetime.datetime.now(), pre_util=None, post_util=None)
-    session.add(decision)
+    # Simulated utilization of the stored queue before and after the override
+    queue = [
+        {
+            'job_id': j.job_id,
+            'req_cpus': j.req_cpus,
+            'pred_cpu_cores': j.pred_cpu_cores,
+            'req_mem_gb': j.req_mem_gb,
+            'pred_mem_gb': j.pred_mem_gb,
+            'state': j.state,
+            'rl_action': j.rl_action
+        } for j in session.query(Job).order_by(Job.submit_time.desc()).all()
+    ]
+    before = simulate(queue, cluster_state=None)
+    for queued in queue:
+        if queued['job_id'] == job_id:
+            queued['rl_action'] = action
+    after = simulate(queue, cluster_state=None)
+    # Log override as a decision through the journal so the minute/hour rollups include it
+    decision_journal.record(job_id, action, datetime.datetime.now(), before['utilization'],
+                            after['utilization'], after['avg_wait_time'])
     # Optionally update job action
     job = session.query(Job).filter_by(job_id=job_id).first()
     if job:
@@ -206,6 +428,157 @@ def get_simulated_job_log():
     session.close()
     return result
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        if profiler.armed and not request.url.path.startswith(("/admin/profile", "/metrics")):
+            name = request.url.path.strip("/").replace("/", "_") or "root"
+            response = await profiler.run_async('request', name, call_next, request)
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None)
+        if path is None:
+            # Only label with known route paths to keep label cardinality bounded
+            path = request.url.path if request.url.path in ROUTE_PATHS else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, path=path, status=status)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    if multiprocess_metrics.running:
+        return Response(content=multiprocess_metrics.render(), media_type=CONTENT_TYPE)
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def call_leader(name, **params):
+    try:
+        return leader_control.call(name, **params)
+    except RuntimeError as e:
+        return {"error": str(e)}
+
+def _arm_profiler(cycles, requests, mode, tracemalloc, sample_interval_ms):
+    if cycles <= 0 and requests <= 0:
+        return profiler.disarm()
+    return profiler.arm(cycles=cycles, requests=requests, mode=mode, trace_memory=tracemalloc,
+                        sample_interval_ms=sample_interval_ms)
+
+@app.post("/admin/profile")
+def arm_profiler(cycles: int = 1, requests: int = 0, mode: str = "sample", tracemalloc: bool = False,
+                 sample_interval_ms: int = 5):
+    if mode not in PROFILING_MODES:
+        return {"error": f"Invalid mode, expected one of {list(PROFILING_MODES)}."}
+    # Armed in the leader, which runs the poll cycles; request profiles cover requests the leader serves
+    return call_leader('profile.arm', cycles=cycles, requests=requests, mode=mode, tracemalloc=tracemalloc,
+                       sample_interval_ms=sample_interval_ms)
+
+@app.get("/admin/profile")
+def get_profiler_status():
+    return call_leader('profile.status')
+
+def replay_status(feeder):
+    session = Session()
+    db_jobs = session.query(Job).count()
+    session.close()
+    status = feeder.stats()
+    status['db_jobs'] = db_jobs
+    status['db_jobs_added'] = db_jobs - getattr(feeder, 'db_jobs_at_start', db_jobs)
+    status['db_bytes'] = os.path.getsize(DB_PATH) if os.path.exists(DB_PATH) else 0
+    return status
+
+def _start_trace_replay(time_warp, max_jobs_per_poll, max_backlog, tick_sec):
+    session = Session()
+    db_jobs = session.query(Job).count()
+    session.close()
+    feeder = slurm_poller.start_replay(time_warp=time_warp, max_jobs_per_poll=max_jobs_per_poll,
+                                       max_backlog=max_backlog, tick_sec=tick_sec)
+    feeder.db_jobs_at_start = db_jobs
+    return replay_status(feeder)
+
+def _get_trace_replay():
+    feeder = slurm_poller.replay_feeder
+    if feeder is None:
+        return {"active": False}
+    return dict(replay_status(feeder), active=True)
+
+def _stop_trace_replay():
+    feeder = slurm_poller.stop_replay()
+    if feeder is None:
+        return {"active": False}
+    return dict(replay_status(feeder), active=False)
+
+# The replay feeder is read by the poller, so it is always driven in the leader
+@app.post("/admin/replay")
+def start_trace_replay(time_warp: float = 1.0, max_jobs_per_poll: int = 100, max_backlog: int = 1000,
+                       tick_sec: Optional[float] = None):
+    if time_warp <= 0 or max_jobs_per_poll <= 0 or max_backlog <= 0:
+        return {"error": "time_warp, max_jobs_per_poll and max_backlog must be positive."}
+    return call_leader('replay.start', time_warp=time_warp, max_jobs_per_poll=max_jobs_per_poll,
+                       max_backlog=max_backlog, tick_sec=tick_sec)
+
+@app.get("/admin/replay")
+def get_trace_replay():
+    return call_leader('replay.status')
+
+@app.post("/admin/replay/stop")
+def stop_trace_replay():
+    return call_leader('replay.stop')
+
+leader_control.register('profile.arm', _arm_profiler)
+leader_control.register('profile.status', profiler.status)
+leader_control.register('replay.start', _start_trace_replay)
+leader_control.register('replay.status', _get_trace_replay)
+leader_control.register('replay.stop', _stop_trace_replay)
+
+@app.get("/workers")
+def get_workers():
+    worker_id = os.environ.get('ADPS_WORKER_ID')
+    # Under the prefork server every worker is a child of the same master
+    pids = child_pids(os.getppid()) if worker_id is not None else [os.getpid()]
+    leader_pid = poller_lock.leader_pid()
+    return {
+        'pid': os.getpid(),
+        'worker_id': worker_id,
+        'is_leader': poller_lock.is_leader,
+        'leader_pid': leader_pid,
+        'workers': [dict(process_memory(pid), is_leader=(pid == leader_pid)) for pid in pids],
+    }
+
+def _activate_model(kind, version):
+    # Load, warm up and check latency off the request path; the swap happens when that passes
+    threading.Thread(target=model_manager.activate, args=(kind, version), name='model-activate',
+                     daemon=True).start()
+    return {"kind": kind, "version": version, "status": "loading"}
+
+# The poller runs on the leader's models, so swaps are made there; other workers follow the manifest
+@app.get("/admin/models")
+def get_models():
+    return call_leader('models.status')
+
+@app.post("/admin/models/{kind}/activate")
+def activate_model(kind: str, version: str):
+    if kind not in MODEL_KINDS:
+        return {"error": f"Invalid model kind, expected one of {list(MODEL_KINDS)}."}
+    try:
+        model_manager.registry.path(kind, version)
+    except KeyError as e:
+        return {"error": str(e)}
+    return call_leader('models.activate', kind=kind, version=version)
+
+@app.post("/admin/models/{kind}/rollback")
+def rollback_model(kind: str):
+    if kind not in MODEL_KINDS:
+        return {"error": f"Invalid model kind, expected one of {list(MODEL_KINDS)}."}
+    # A ModelSwapError (nothing to roll back to) comes back as an error reply
+    return call_leader('models.rollback', kind=kind)
+
+leader_control.register('models.status', model_manager.status)
+leader_control.register('models.activate', _activate_model)
+leader_control.register('models.rollback', model_manager.rollback)
+
 @app.get("/openapi.json", include_in_schema=False)
 def custom_openapi():
     return get_openapi(
@@ -214,5 +587,7 @@ def custom_openapi():
         routes=app.routes,
     )
 
+ROUTE_PATHS = {route.path for route in app.routes}
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
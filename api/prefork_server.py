@@ -0,0 +1,134 @@
+# prefork_server.py
+# Multi-worker API serving with copy-on-write shared models.
+# The master imports the API (loading the XGBoost pipelines and the PPO policy) and the SWF trace,
+# freezes the GC so those objects are not dirtied by collections, binds the listening socket and
+# then forks the workers, which share the preloaded pages copy-on-write. Each worker runs its own
+# uvicorn server on the shared socket; exactly one of them wins the poller leader lock, and the
+# others forward poller admin calls to it (see LeaderControl) and share metrics through dump files.
+#
+# Usage: python -m api.prefork_server --workers 4 --port 8000
+import argparse
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
+
+logger = logging.getLogger("prefork_server")
+
+def preload():
+    gc.disable()
+    from api import api_server
+    from services import slurm_poller
+    if slurm_poller.USE_MOCK and os.path.exists(slurm_poller.SWF_PATH):
+        slurm_poller.get_swf_feeder()
+    if api_server.MODEL_REGISTRY_CONFIG.get('enabled'):
+        # Swap in the manifest's active versions here, or every worker would load private copies at startup
+        api_server.model_manager.sync()
+    # Pooled DB connections must not be shared across fork; workers open their own
+    api_server.engine.dispose()
+    gc.collect()
+    # Move everything allocated so far to the permanent generation so worker GCs never touch it
+    gc.freeze()
+    return api_server
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(app, sock, worker_id):
+    import uvicorn
+    gc.enable()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    os.environ['ADPS_WORKER_ID'] = str(worker_id)
+    server = uvicorn.Server(uvicorn.Config(app, log_level='info'))
+    server.run(sockets=[sock])
+    os._exit(0)
+
+def spawn(app, sock, worker_id):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, sock, worker_id)
+        finally:
+            os._exit(1)
+    logger.info(f"Started worker {worker_id} (pid {pid})")
+    return pid
+
+def log_memory(workers):
+    from services.multiworker import process_memory
+    for worker_id, pid in sorted(workers.items()):
+        mem = process_memory(pid)
+        logger.info(f"worker {worker_id} pid={pid} rss={mem.get('rss_mb', 0):.1f}MB "
+                    f"pss={mem.get('pss_mb', 0):.1f}MB shared={mem.get('shared_mb', 0):.1f}MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the API from several forked workers")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--memory-report-sec", type=float, default=300.0,
+                        help="Log per-worker RSS/PSS this often (0 disables)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    api_server = preload()
+    logger.info(f"Preloaded models and trace in {time.perf_counter() - start:.1f}s")
+    # Metric dumps left by a previous run's workers would otherwise be added to this run's totals
+    shutil.rmtree(api_server.multiprocess_metrics.directory, ignore_errors=True)
+    sock = bind_socket(args.host, args.port)
+
+    workers = {}  # worker_id -> pid
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers.values():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for worker_id in range(args.workers):
+        workers[worker_id] = spawn(api_server.app, sock, worker_id)
+
+    next_report = time.monotonic() + args.memory_report_sec
+    log_memory(workers)
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if args.memory_report_sec and time.monotonic() >= next_report:
+                log_memory(workers)
+                next_report = time.monotonic() + args.memory_report_sec
+            time.sleep(0.5)
+            continue
+        worker_id = next((w for w, p in workers.items() if p == pid), None)
+        if worker_id is None:
+            continue
+        del workers[worker_id]
+        if not stopping:
+            logger.warning(f"Worker {worker_id} (pid {pid}) exited with status {status}; restarting")
+            workers[worker_id] = spawn(api_server.app, sock, worker_id)
+    sock.close()
+    logger.info("All workers stopped.")
+
+if __name__ == "__main__":
+    main()
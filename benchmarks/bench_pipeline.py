@@ -0,0 +1,215 @@
+# bench_pipeline.py
+# Per-stage benchmark of the poll -> predict -> decide -> simulate -> store cycle
+#
+# Usage:
+#   python benchmarks/bench_pipeline.py                       # run, compare against benchmarks/baseline.json if present
+#   python benchmarks/bench_pipeline.py --save-baseline       # run and store the results as the new baseline
+#   python benchmarks/bench_pipeline.py --output results.json --batch-sizes 1 5 50
+#
+# Everything runs offline: the trace is synthetic and the DB is a temporary SQLite file.
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
+from benchmarks.synthetic_swf import generate_swf, SIZE_DISTRIBUTIONS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+PARSE_STAGES = ['swf_parse']
+MODEL_STAGES = ['cpu_predict', 'mem_predict', 'rl_decide', 'simulate', 'update_job_queue', 'end_to_end']
+ALL_STAGES = PARSE_STAGES + MODEL_STAGES
+
+logger = logging.getLogger("bench_pipeline")
+
+def _timeit(fn, repeats, warmup):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    return {
+        'repeats': repeats,
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        'min_ms': samples[0],
+        'max_ms': samples[-1],
+    }
+
+def _load_pipeline(db_path):
+    # Import the real API module so update_job_queue is benchmarked exactly as deployed. The import
+    # creates the engine and tables, so the throwaway database has to be chosen before it.
+    os.environ['ADPS_DB_PATH'] = db_path
+    from api import api_server
+    api_server.decision_journal.start()
+    return api_server
+
+def _run_cycle(pipeline, feeder, n):
+    # update_job_queue logs and swallows errors, returning []; a failed cycle must not benchmark as fast
+    if feeder.idx + n > len(feeder.jobs):
+        feeder.idx = 0  # the feeder would return a short batch at the end of the trace
+    errors = pipeline.CYCLE_ERRORS.value()
+    jobs = pipeline.update_job_queue()
+    if pipeline.CYCLE_ERRORS.value() != errors or len(jobs) != n:
+        raise RuntimeError(f"update_job_queue failed at batch size {n} ({len(jobs)} jobs returned); see the log above")
+    return jobs
+
+def run_benchmarks(trace_path, batch_sizes, stages, repeats, warmup):
+    from services import slurm_poller
+    from services.slurm_poller import SWFJobFeeder
+    results = {}
+
+    if 'swf_parse' in stages:
+        stats = _timeit(lambda: SWFJobFeeder(trace_path), max(1, repeats // 4), min(warmup, 1))
+        n_jobs = len(SWFJobFeeder(trace_path).jobs)
+        stats['jobs'] = n_jobs
+        stats['per_job_us'] = stats['median_ms'] * 1000.0 / max(n_jobs, 1)
+        results['swf_parse'] = stats
+
+    model_stages = [s for s in stages if s in MODEL_STAGES]
+    if not model_stages:
+        return results
+
+    tmpdir = tempfile.mkdtemp(prefix='adps_bench_')
+    feeder = SWFJobFeeder(trace_path)
+    slurm_poller.swf_feeder = feeder
+    pipeline = _load_pipeline(os.path.join(tmpdir, 'bench.db'))
+    for handler in logging.getLogger().handlers:
+        handler.setLevel(logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for n in batch_sizes:
+        if n > len(feeder.jobs):
+            raise ValueError(f"Batch size {n} exceeds the {len(feeder.jobs)} jobs in the trace")
+        batch = [dict(job) for job in feeder.jobs[:n]]
+        predicted = [pipeline.mem_predictor.predict(pipeline.cpu_predictor.predict(job)) for job in batch]
+        decided = pipeline.rl_scheduler.decide([dict(job) for job in predicted], cluster_state=None)
+        if len(decided) != n or any(job.get('rl_action') not in ('RUN', 'HOLD') for job in decided):
+            raise RuntimeError(f"RL scheduler did not decide every job at batch size {n}")
+
+        def cpu_stage():
+            for job in batch:
+                pipeline.cpu_predictor.predict(job)
+
+        def mem_stage():
+            for job in batch:
+                pipeline.mem_predictor.predict(job)
+
+        def rl_stage():
+            pipeline.rl_scheduler.decide([dict(job) for job in predicted], cluster_state=None)
+
+        def sim_stage():
+            pipeline.simulate(decided, cluster_state=None)
+
+        def store_stage():
+            _run_cycle(pipeline, feeder, n)
+
+        def e2e_stage():
+            pipeline.simulate(_run_cycle(pipeline, feeder, n), cluster_state=None)
+
+        stage_fns = {
+            'cpu_predict': cpu_stage,
+            'mem_predict': mem_stage,
+            'rl_decide': rl_stage,
+            'simulate': sim_stage,
+            'update_job_queue': store_stage,
+            'end_to_end': e2e_stage,
+        }
+        slurm_poller.POLL_BATCH_SIZE = n
+        for stage in model_stages:
+            feeder.idx = 0
+            stats = _timeit(stage_fns[stage], repeats, warmup)
+            stats['batch_size'] = n
+            stats['per_job_us'] = stats['median_ms'] * 1000.0 / n
+            results[f'{stage}@{n}'] = stats
+    pipeline.decision_journal.stop()
+    return results
+
+def compare_to_baseline(results, baseline, tolerance):
+    regressions = []
+    for key, stats in results.items():
+        base = baseline.get('results', {}).get(key)
+        if not base:
+            continue
+        limit = base['median_ms'] * (1.0 + tolerance)
+        if stats['median_ms'] > limit:
+            regressions.append({
+                'stage': key,
+                'baseline_median_ms': base['median_ms'],
+                'median_ms': stats['median_ms'],
+                'ratio': stats['median_ms'] / base['median_ms'] if base['median_ms'] else float('inf'),
+            })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the scheduling pipeline")
+    parser.add_argument("--trace", help="Existing SWF trace to use instead of a synthetic one")
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--size-dist", choices=SIZE_DISTRIBUTIONS, default='pow2')
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-sizes", type=int, nargs='+', default=[1, 5, 10, 50])
+    parser.add_argument("--stages", nargs='+', choices=ALL_STAGES, default=ALL_STAGES)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--output", help="Write JSON results to this path (default: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown of a stage's median over the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    trace_path = args.trace
+    if trace_path is None:
+        trace_path = os.path.join(tempfile.mkdtemp(prefix='adps_bench_'), 'synthetic.swf')
+        generate_swf(trace_path, seed=args.seed, n_jobs=args.jobs, n_users=args.users, size_dist=args.size_dist)
+
+    results = run_benchmarks(trace_path, args.batch_sizes, args.stages, args.repeats, args.warmup)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'trace': args.trace or 'synthetic',
+            'jobs': args.jobs,
+            'users': args.users,
+            'size_dist': args.size_dist,
+            'seed': args.seed,
+            'repeats': args.repeats,
+        },
+        'results': results,
+    }
+
+    exit_code = 0
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Baseline written to {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare_to_baseline(results, baseline, args.tolerance)
+        for r in report['regressions']:
+            print(f"[FAIL] {r['stage']}: {r['median_ms']:.3f} ms vs baseline {r['baseline_median_ms']:.3f} ms "
+                  f"(x{r['ratio']:.2f})", file=sys.stderr)
+        if report['regressions']:
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# replay_load.py
+# Accelerated trace-replay load generator against a running API server.
+# For each time-warp factor it starts a replay via /admin/replay, lets it run, samples
+# decision latency, backlog, DB growth and dropped cycles, and reports the first factor
+# at which the system saturates.
+#
+# Usage:
+#   python benchmarks/replay_load.py --warps 1 100 10000 --duration 60
+#   python benchmarks/replay_load.py --api http://localhost:8000 --output replay.json
+import argparse
+import json
+import sys
+import time
+
+import requests
+
+def run_step(api, warp, duration, max_jobs_per_poll, max_backlog, tick_sec, sample_every):
+    params = {'time_warp': warp, 'max_jobs_per_poll': max_jobs_per_poll, 'max_backlog': max_backlog}
+    if tick_sec:
+        params['tick_sec'] = tick_sec
+    resp = requests.post(f"{api}/admin/replay", params=params)
+    resp.raise_for_status()
+    samples = []
+    deadline = time.monotonic() + duration
+    try:
+        while time.monotonic() < deadline:
+            time.sleep(min(sample_every, max(0.0, deadline - time.monotonic())))
+            status = requests.get(f"{api}/admin/replay").json()
+            samples.append(status)
+            print(f"[{warp:>8}x] t={status['elapsed_sec']:.0f}s arrived={status['arrived']} "
+                  f"decided={status['decided']} backlog={status['backlog']} dropped_jobs={status['dropped_jobs']} "
+                  f"dropped_cycles={status['dropped_cycles']} p95={status['decision_latency_p95_sec']}",
+                  file=sys.stderr)
+            if status.get('finished'):
+                break
+    finally:
+        final = requests.post(f"{api}/admin/replay/stop").json()
+    final['samples'] = samples
+    return final
+
+def is_saturated(result, max_p95):
+    p95 = result.get('decision_latency_p95_sec')
+    return (result.get('dropped_jobs', 0) > 0
+            or result.get('dropped_cycles', 0) > 0
+            or (p95 is not None and p95 > max_p95))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the SWF trace against the running API at increasing speeds")
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--warps", type=float, nargs='+', default=[1, 100, 10000])
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run each time-warp factor")
+    parser.add_argument("--max-jobs-per-poll", type=int, default=100)
+    parser.add_argument("--max-backlog", type=int, default=1000)
+    parser.add_argument("--tick-sec", type=float, help="Replay poll tick (default: the server's poll interval)")
+    parser.add_argument("--sample-every", type=float, default=5.0)
+    parser.add_argument("--max-p95", type=float, default=30.0,
+                        help="p95 submit-to-decision latency (s) above which a step counts as saturated")
+    parser.add_argument("--output", help="Write JSON results to this path (default: stdout)")
+    args = parser.parse_args(argv)
+
+    results = []
+    saturation = None
+    for warp in args.warps:
+        result = run_step(args.api, warp, args.duration, args.max_jobs_per_poll, args.max_backlog,
+                          args.tick_sec, args.sample_every)
+        result['saturated'] = is_saturated(result, args.max_p95)
+        results.append(result)
+        if result['saturated'] and saturation is None:
+            saturation = warp
+
+    report = {'warps': args.warps, 'saturation_warp': saturation, 'results': results}
+    for r in results:
+        print(f"{r['time_warp']:>10}x  arrivals/s={r['arrival_rate_per_sec']:.2f}  decisions/s={r['decision_rate_per_sec']:.2f}  "
+              f"p50={r['decision_latency_p50_sec']}  p95={r['decision_latency_p95_sec']}  p99={r['decision_latency_p99_sec']}  "
+              f"db_jobs_added={r['db_jobs_added']}  dropped_jobs={r['dropped_jobs']}  dropped_cycles={r['dropped_cycles']}"
+              f"{'  SATURATED' if r['saturated'] else ''}", file=sys.stderr)
+    if saturation is None:
+        print("[INFO] No saturation observed at the tested time-warp factors.", file=sys.stderr)
+    else:
+        print(f"[INFO] Saturation first observed at {saturation}x.", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# synthetic_swf.py
+# Seeded generator for synthetic SWF (Standard Workload Format) traces used by the benchmarks
+import argparse
+import random
+
+SIZE_DISTRIBUTIONS = ('pow2', 'uniform', 'lognormal')
+
+def _job_size(rng, size_dist, max_cpus):
+    if size_dist == 'pow2':
+        # Most HPC traces are dominated by power-of-two requests, skewed towards small jobs
+        exp = min(int(rng.expovariate(0.6)), max_cpus.bit_length() - 1)
+        return 2 ** exp
+    if size_dist == 'uniform':
+        return rng.randint(1, max_cpus)
+    if size_dist == 'lognormal':
+        return max(1, min(max_cpus, int(rng.lognormvariate(1.5, 1.2))))
+    raise ValueError(f"Unknown size distribution: {size_dist}")
+
+def generate_jobs(n_jobs=1000, n_users=50, user_skew=1.2, size_dist='pow2', max_cpus=64,
+                  mean_interarrival=30.0, start_time=1262304000, seed=42):
+    """Return a list of 18-field SWF rows (lists of strings)."""
+    if size_dist not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"Unknown size distribution: {size_dist}")
+    rng = random.Random(seed)
+    # Zipf-like user mix: a few heavy users submit most of the jobs
+    user_weights = [1.0 / (rank ** user_skew) for rank in range(1, n_users + 1)]
+    users = list(range(1, n_users + 1))
+    submit_time = start_time
+    rows = []
+    for job_id in range(1, n_jobs + 1):
+        submit_time += int(rng.expovariate(1.0 / mean_interarrival))
+        user_id = rng.choices(users, weights=user_weights)[0]
+        procs = _job_size(rng, size_dist, max_cpus)
+        req_time = rng.choice([600, 1800, 3600, 7200, 14400, 43200, 86400])
+        run_time = max(1, int(req_time * rng.betavariate(2, 3)))
+        wait_time = int(rng.expovariate(1.0 / 120))
+        req_mem_mb = procs * rng.choice([512, 1024, 2048, 4096])
+        used_mem_mb = int(req_mem_mb * rng.uniform(0.2, 1.0))
+        rows.append([
+            job_id, submit_time, wait_time, run_time, procs, -1, used_mem_mb, procs,
+            req_time, req_mem_mb, 1, user_id, (user_id % 5) + 1, rng.randint(1, 20),
+            rng.randint(1, 4), 1, -1, -1
+        ])
+    return [[str(v) for v in row] for row in rows]
+
+def write_swf(path, rows, seed=None):
+    with open(path, 'w') as f:
+        f.write("; Synthetic SWF trace generated by benchmarks/synthetic_swf.py\n")
+        if seed is not None:
+            f.write(f"; Seed: {seed}\n")
+        f.write(f"; MaxJobs: {len(rows)}\n")
+        for row in rows:
+            f.write(" ".join(row) + "\n")
+    return path
+
+def generate_swf(path, seed=42, **kwargs):
+    return write_swf(path, generate_jobs(seed=seed, **kwargs), seed=seed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic SWF trace")
+    parser.add_argument("output")
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--user-skew", type=float, default=1.2)
+    parser.add_argument("--size-dist", choices=SIZE_DISTRIBUTIONS, default='pow2')
+    parser.add_argument("--max-cpus", type=int, default=64)
+    parser.add_argument("--mean-interarrival", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate_swf(args.output, seed=args.seed, n_jobs=args.jobs, n_users=args.users,
+                 user_skew=args.user_skew, size_dist=args.size_dist, max_cpus=args.max_cpus,
+                 mean_interarrival=args.mean_interarrival)
+    print(f"Wrote {args.jobs} jobs to {args.output}")
@@ -1,17 +1,25 @@
 # db_migration.py
-# Simple migration script to add new columns to jobs table if missing
+# Simple migration script to add new columns to jobs table if missing, plus decision rollup tables
 from sqlalchemy import create_engine, inspect, Column, String, Integer, text
-from db.db_models import Base, Job
+from db.db_models import Base, Job, DecisionRollup
 import os
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '../data/scheduler.db')
 engine = create_engine(f'sqlite:///{DB_PATH}')
 inspector = inspect(engine)
 
-with engine.connect() as conn:
+with engine.begin() as conn:
     columns = [col['name'] for col in inspector.get_columns('jobs')]
     if 'partition' not in columns:
         conn.execute(text('ALTER TABLE jobs ADD COLUMN partition VARCHAR'))
     if 'est_run_time' not in columns:
         conn.execute(text('ALTER TABLE jobs ADD COLUMN est_run_time INTEGER'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_decisions_timestamp ON decisions (timestamp)'))
+DecisionRollup.__table__.create(engine, checkfirst=True)
+with engine.begin() as conn:
+    columns = [col['name'] for col in inspect(engine).get_columns('decision_rollups')]
+    if 'cycles' not in columns:
+        conn.execute(text('ALTER TABLE decision_rollups ADD COLUMN cycles INTEGER DEFAULT 0'))
+    if 'cycle_util_sum' not in columns:
+        conn.execute(text('ALTER TABLE decision_rollups ADD COLUMN cycle_util_sum FLOAT DEFAULT 0.0'))
 print("Migration complete.")
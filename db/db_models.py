@@ -1,6 +1,6 @@
 # db_models.py
 # SQLAlchemy models for jobs and decisions
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -24,6 +24,23 @@ class Decision(Base):
     id = Column(Integer, primary_key=True)
     job_id = Column(Integer)
     action = Column(String)
-    timestamp = Column(DateTime)
+    timestamp = Column(DateTime, index=True)
     pre_util = Column(Float)
     post_util = Column(Float)
+
+class DecisionRollup(Base):
+    # Per-minute/per-hour aggregates of decisions, maintained by the decision journal at flush time
+    __tablename__ = 'decision_rollups'
+    __table_args__ = (UniqueConstraint('granularity', 'bucket_start'),)
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String)  # 'minute' or 'hour'
+    bucket_start = Column(DateTime, index=True)
+    decisions = Column(Integer, default=0)
+    run_count = Column(Integer, default=0)
+    hold_count = Column(Integer, default=0)
+    pre_util_sum = Column(Float, default=0.0)
+    post_util_sum = Column(Float, default=0.0)
+    wait_time_sum = Column(Float, default=0.0)
+    # Poll cycles ending in the bucket and the sum of their end-of-cycle utilization (overrides add none)
+    cycles = Column(Integer, default=0)
+    cycle_util_sum = Column(Float, default=0.0)
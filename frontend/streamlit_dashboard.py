@@ -121,7 +121,8 @@ elif tab == "History":
     start = st.date_input("Start date")
     end = st.date_input("End date")
     job_id_filter = st.text_input("Filter by Job ID (optional)")
-    params = {"start": str(start), "end": str(end)}
+    granularity = st.selectbox("Granularity", ["auto", "raw", "minute", "hour"])
+    params = {"start": str(start), "end": str(end), "granularity": granularity}
     if job_id_filter:
         params["job_id"] = job_id_filter
     data = fetch_api("/history", params)
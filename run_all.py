@@ -3,7 +3,11 @@
 Script to start both the FastAPI backend and the Streamlit dashboard.
 - Starts the API server in a background process
 - Starts the Streamlit dashboard in the foreground
+
+Pass --workers N (N > 1) to serve the API from N forked workers sharing preloaded models
+(see api/prefork_server.py).
 """
+import argparse
 import subprocess
 import sys
 import os
@@ -22,10 +26,16 @@ if not os.path.exists(API_PATH):
 if not os.path.exists(DASH_PATH):
     raise FileNotFoundError(f"Streamlit dashboard not found at {DASH_PATH}")
 
+parser = argparse.ArgumentParser(description="Start the API server and the Streamlit dashboard")
+parser.add_argument("--workers", type=int, default=1, help="Number of API worker processes")
+args = parser.parse_args()
+
 # Start API server (background) in the correct working directory
-api_proc = subprocess.Popen([
-    sys.executable, "-m", "uvicorn", "api.api_server:app", "--host", "0.0.0.0", "--port", "8000"
-], cwd=os.getcwd())
+if args.workers > 1:
+    api_cmd = [sys.executable, "-m", "api.prefork_server", "--workers", str(args.workers), "--host", "0.0.0.0", "--port", "8000"]
+else:
+    api_cmd = [sys.executable, "-m", "uvicorn", "api.api_server:app", "--host", "0.0.0.0", "--port", "8000"]
+api_proc = subprocess.Popen(api_cmd, cwd=os.getcwd())
 print("[INFO] API server started on http://localhost:8000 (PID: %d)" % api_proc.pid)
 
 # Wait a bit to ensure API is up
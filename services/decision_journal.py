@@ -0,0 +1,175 @@
+# decision_journal.py
+# Write-behind journal for RL decisions: the poll cycle enqueues decisions without touching the DB,
+# and a background thread flushes them in batched transactions while maintaining the
+# minute/hour rollup tables used by /history for long time ranges.
+import datetime
+import logging
+import queue
+import threading
+import time
+
+from db.db_models import Decision, DecisionRollup
+from services.metrics import Counter, Gauge, Histogram
+from services.simulator import utilization_steps
+
+logger = logging.getLogger("decision_journal")
+
+GRANULARITIES = ('minute', 'hour')
+
+JOURNAL_FLUSH_LATENCY = Histogram('adps_journal_flush_seconds', 'Decision journal batch flush latency')
+JOURNAL_WRITTEN = Counter('adps_journal_decisions_written_total', 'Decisions written by the journal')
+JOURNAL_DROPPED = Counter('adps_journal_decisions_dropped_total', 'Decisions dropped because the journal queue was full or the DB failed at shutdown')
+JOURNAL_FLUSH_ERRORS = Counter('adps_journal_flush_errors_total', 'Journal flushes that failed')
+JOURNAL_QUEUE_DEPTH = Gauge('adps_journal_queue_depth', 'Decisions waiting to be flushed')
+
+def bucket_start(timestamp, granularity):
+    if granularity == 'minute':
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def aggregate(rows):
+    """Fold decision rows into {(granularity, bucket_start): totals}."""
+    buckets = {}
+    for row in rows:
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(row['timestamp'], granularity))
+            agg = buckets.setdefault(key, {'decisions': 0, 'run_count': 0, 'hold_count': 0,
+                                           'pre_util_sum': 0.0, 'post_util_sum': 0.0, 'wait_time_sum': 0.0,
+                                           'cycles': 0, 'cycle_util_sum': 0.0})
+            agg['decisions'] += 1
+            if row['action'] == 'RUN':
+                agg['run_count'] += 1
+            elif row['action'] == 'HOLD':
+                agg['hold_count'] += 1
+            agg['pre_util_sum'] += row['pre_util'] or 0.0
+            agg['post_util_sum'] += row['post_util'] or 0.0
+            agg['wait_time_sum'] += row.get('wait_time') or 0.0
+            if row.get('cycle_util') is not None:
+                agg['cycles'] += 1
+                agg['cycle_util_sum'] += row['cycle_util']
+    return buckets
+
+class DecisionJournal:
+    def __init__(self, session_factory, flush_interval=1.0, max_batch=1000, max_queue=100000, max_retry_interval=30.0):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_retry_interval = max_retry_interval
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record_cycle(self, jobs, metrics, timestamp=None):
+        """Enqueue one decision per job for a poll cycle; never blocks the caller.
+
+        pre_util/post_util are the simulated cluster's utilization just before and after each decision,
+        with the cycle's jobs packed in decision order (see simulator.utilization_steps). The cycle's own
+        utilization (metrics['utilization'], the last step) rides on its last decision for the rollups.
+        """
+        timestamp = timestamp or datetime.datetime.now()
+        pre_util = 0.0
+        steps = utilization_steps(jobs)
+        for i, (job, post_util) in enumerate(zip(jobs, steps)):
+            cycle_util = metrics.get('utilization') if i == len(steps) - 1 else None
+            self.record(job['job_id'], job.get('rl_action'), timestamp, pre_util, post_util,
+                        metrics.get('avg_wait_time'), cycle_util=cycle_util)
+            pre_util = post_util
+
+    def record(self, job_id, action, timestamp, pre_util, post_util, wait_time=None, cycle_util=None):
+        try:
+            self.queue.put_nowait({'job_id': job_id, 'action': action, 'timestamp': timestamp,
+                                   'pre_util': pre_util, 'post_util': post_util, 'wait_time': wait_time,
+                                   'cycle_util': cycle_util})
+        except queue.Full:
+            JOURNAL_DROPPED.inc()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='decision-journal', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stop the writer thread after flushing everything already queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _drain(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        batch, failures = [], 0
+        while not self._stop.is_set() or not self.queue.empty() or batch:
+            # A batch that failed to flush is retried as is; new decisions keep queueing meanwhile
+            batch = batch or self._drain()
+            JOURNAL_QUEUE_DEPTH.set(self.queue.qsize() + len(batch))
+            if not batch or self.flush(batch):
+                batch, failures = [], 0
+                continue
+            failures += 1
+            if self._stop.is_set():
+                # Shutting down with the DB still failing; give each remaining batch one attempt
+                JOURNAL_DROPPED.inc(len(batch))
+                logger.error(f"Dropped {len(batch)} decisions that could not be flushed before shutdown")
+                batch = []
+                continue
+            # Back off so a locked or unavailable DB is not hammered
+            self._stop.wait(min(self.max_retry_interval, self.flush_interval * 2 ** (failures - 1)))
+
+    def flush(self, rows):
+        """Write rows and their rollup deltas in one transaction; returns False (nothing written) on failure."""
+        session = None
+        try:
+            session = self.session_factory()
+            with JOURNAL_FLUSH_LATENCY.time():
+                session.bulk_insert_mappings(Decision, [
+                    {k: row[k] for k in ('job_id', 'action', 'timestamp', 'pre_util', 'post_util')} for row in rows
+                ])
+                self._update_rollups(session, aggregate(rows))
+                session.commit()
+            JOURNAL_WRITTEN.inc(len(rows))
+            return True
+        except Exception as e:
+            if session is not None:
+                session.rollback()
+            JOURNAL_FLUSH_ERRORS.inc()
+            logger.error(f"Failed to flush {len(rows)} decisions: {e}")
+            return False
+        finally:
+            if session is not None:
+                session.close()
+
+    def _update_rollups(self, session, buckets):
+        # Single writer thread, so read-modify-write per bucket is safe without upserts
+        for granularity in GRANULARITIES:
+            keys = [start for (g, start) in buckets if g == granularity]
+            if not keys:
+                continue
+            existing = {
+                r.bucket_start: r for r in session.query(DecisionRollup).filter(
+                    DecisionRollup.granularity == granularity,
+                    DecisionRollup.bucket_start.in_(keys))
+            }
+            for start in keys:
+                agg = buckets[(granularity, start)]
+                rollup = existing.get(start)
+                if rollup is None:
+                    session.add(DecisionRollup(granularity=granularity, bucket_start=start, **agg))
+                    continue
+                for field, value in agg.items():
+                    setattr(rollup, field, (getattr(rollup, field) or 0) + value)
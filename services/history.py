@@ -0,0 +1,27 @@
+# history.py
+# Query-bound parsing and auto granularity for /history, which serves raw decisions or the decision
+# journal's minute/hour rollups depending on the requested span.
+import datetime
+
+# Spans up to this long are served from raw decisions, then minute rollups, then hour rollups
+AUTO_RAW_SPAN = datetime.timedelta(hours=6)
+AUTO_MINUTE_SPAN = datetime.timedelta(days=7)
+
+def history_bounds(start, end):
+    """Parse /history's ISO bounds; a date-only end covers that whole day. Raises ValueError."""
+    start_dt = datetime.datetime.fromisoformat(start) if start else None
+    end_dt = datetime.datetime.fromisoformat(end) if end else None
+    if end_dt is not None and len(end) == 10:
+        end_dt += datetime.timedelta(days=1, microseconds=-1)
+    return start_dt, end_dt
+
+def history_granularity(start, end, now=None):
+    """Pick raw, minute or hour for a span; an open start means all of history."""
+    if start is None:
+        return 'hour'
+    span = (end or now or datetime.datetime.now()) - start
+    if span <= AUTO_RAW_SPAN:
+        return 'raw'
+    if span <= AUTO_MINUTE_SPAN:
+        return 'minute'
+    return 'hour'
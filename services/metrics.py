@@ -0,0 +1,270 @@
+# metrics.py
+# Minimal, thread-safe Prometheus-style metrics (counters, gauges, histograms)
+# rendered in the text exposition format for the /metrics endpoint
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("metrics")
+
+# Latency buckets in seconds, from 1 ms up to a 60 s poll cycle
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if registry is None:
+            registry = REGISTRY
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self):
+        with self._lock:
+            children = [[list(key), value] for key, value in self._children.items()]
+        return {'kind': self.kind, 'documentation': self.documentation, 'labelnames': list(self.labelnames),
+                'children': children}
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._children.items())
+            lines.extend(self._render_children(items))
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._children.get(self._key(labels), 0)
+
+    def _merge(self, children):
+        with self._lock:
+            for key, value in children:
+                key = tuple(key)
+                self._children[key] = self._children.get(key, 0) + value
+
+    def _render_children(self, items):
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def dump(self):
+        with self._lock:
+            children = [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._children.items()]
+        return {'kind': self.kind, 'documentation': self.documentation, 'labelnames': list(self.labelnames),
+                'buckets': list(self.buckets), 'children': children}
+
+    def _merge(self, children):
+        with self._lock:
+            for key, (counts, total, count) in children:
+                child = self._children.setdefault(tuple(key), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                child[0] = [a + b for a, b in zip(child[0], counts)]
+                child[1] += total
+                child[2] += count
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                # Per-bucket (non-cumulative) counts plus one overflow slot, then sum and count
+                child = self._children[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            child[0][idx] += 1
+            child[1] += value
+            child[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """Return (cumulative bucket counts, sum, count) for one label set."""
+        with self._lock:
+            child = self._children.get(self._key(labels))
+            if child is None:
+                return [0] * (len(self.buckets) + 1), 0.0, 0
+            counts, total, count = list(child[0]), child[1], child[2]
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def _render_children(self, items):
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float('inf'),), counts):
+                running += c
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                yield f'{self.name}_bucket{labels} {running}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {count}'
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        """JSON-serialisable state of every metric, for merging across processes."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.dump() for metric in metrics}
+
+REGISTRY = Registry()
+
+METRIC_TYPES = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+def merge_dumps(dumps):
+    """Sum Registry.dump() outputs from several processes into a fresh Registry."""
+    registry = Registry()
+    for dump in dumps:
+        for name, state in dump.items():
+            metric = registry.get(name)
+            if metric is None:
+                extra = {'buckets': state['buckets']} if state['kind'] == 'histogram' else {}
+                metric = METRIC_TYPES[state['kind']](name, state['documentation'], state['labelnames'],
+                                                     registry=registry, **extra)
+            metric._merge(state['children'])
+    return registry
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class MultiprocessMetrics:
+    """Aggregates the registries of forked API workers through per-pid dump files in a shared directory.
+
+    Every worker rewrites its own file every `interval` seconds and any worker can render the sum, so scrapes
+    see the same totals whichever worker answers. Renders read only the files (never a live registry), so
+    each worker's contribution only moves forward. Files of dead workers are kept so their counters do not
+    go backwards; their gauges are dropped. The directory must be cleared when the server starts.
+    """
+
+    def __init__(self, directory, registry=None, interval=5.0):
+        self.directory = directory
+        self.registry = registry or REGISTRY
+        self.interval = interval
+        self.running = False
+        self._stop = threading.Event()
+
+    def write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.registry.dump(), f)
+        os.replace(path + '.tmp', path)
+
+    def start(self):
+        self.write()
+        self.running = True
+
+        def loop():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.write()
+                except OSError as e:
+                    logger.error(f"Failed to write metrics dump: {e}")
+        threading.Thread(target=loop, name='metrics-dump', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self.running:
+            self.write()
+            self.running = False
+
+    def render(self):
+        dumps = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                pid = int(filename[:-len('.json')])
+                with open(os.path.join(self.directory, filename)) as f:
+                    dump = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(pid):
+                dump = {name: state for name, state in dump.items() if state['kind'] != 'gauge'}
+            dumps.append(dump)
+        return merge_dumps(dumps).render()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
@@ -0,0 +1,345 @@
+# model_registry.py
+# Versioned model registry with background load, warm-up, latency check, atomic hot swap and rollback.
+#
+# Layout (root defaults to models/registry):
+#   manifest.json
+#   cpu/<version>/xgb_runtime_model.joblib
+#   mem/<version>/xgb_memory_model.joblib
+#   rl/<version>/ppo_hpc_scheduler.zip
+#
+# manifest.json: {"models": {"cpu": {"active": "v2", "previous": "v1",
+#                                     "versions": {"v1": {"path": "cpu/v1/...", "registered": "...", "sha256": "..."}}}}}
+#
+# The live CPUPredictor/MemPredictor/RLScheduler objects are never replaced; only their `model` attribute is
+# reassigned, which is a single atomic reference swap, so in-flight predictions finish on the old model.
+# Replicas of the models in other processes (the shard workers) load and warm up a candidate first and swap
+# only once every replica and this process have passed the checks.
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+
+logger = logging.getLogger("model_registry")
+
+KINDS = {
+    'cpu': 'xgb_runtime_model.joblib',
+    'mem': 'xgb_memory_model.joblib',
+    'rl': 'ppo_hpc_scheduler.zip',
+}
+DEFAULT_ROOT = os.path.join(os.path.dirname(__file__), '../models/registry')
+# The artifacts loaded at startup are registered under this version before the first swap, so a rollback
+# to them is recorded in the manifest like any other
+BASELINE_VERSION = 'baseline'
+# p95 latency budgets: per job for the predictors, per batch for the RL scheduler
+DEFAULT_MAX_LATENCY_MS = {'cpu': 50.0, 'mem': 50.0, 'rl': 200.0}
+
+class ModelSwapError(RuntimeError):
+    pass
+
+def default_artifact(kind):
+    return os.path.join(os.path.dirname(__file__), '../models', KINDS[kind])
+
+def load_model(kind, path):
+    if kind in ('cpu', 'mem'):
+        import joblib
+        return joblib.load(path)
+    if kind == 'rl':
+        from stable_baselines3 import PPO
+        return PPO.load(path)
+    raise ValueError(f"Unknown model kind: {kind}")
+
+def warm_up(kind, holder, jobs):
+    """Run a model holder on a sample batch; returns the steady-state p95 latency in ms."""
+    samples = []
+    if kind == 'rl':
+        for _ in range(3):
+            t0 = time.perf_counter()
+            decided = holder.decide([dict(job) for job in jobs[:10]], cluster_state=None)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+        if any(job.get('rl_action') not in ('RUN', 'HOLD') for job in decided):
+            raise ModelSwapError("RL warm-up produced invalid actions")
+    else:
+        key = 'pred_cpu_cores' if kind == 'cpu' else 'pred_mem_gb'
+        for job in jobs:
+            t0 = time.perf_counter()
+            value = holder.predict(job).get(key)
+            samples.append((time.perf_counter() - t0) * 1000.0)
+            if value is None or not math.isfinite(value):
+                raise ModelSwapError(f"{kind} warm-up produced a non-finite prediction")
+    # The first calls pay one-off costs (lazy init, caches); judge steady-state latency
+    steady = sorted(samples[1:] or samples)
+    return steady[max(0, math.ceil(0.95 * len(steady)) - 1)]
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ModelRegistry:
+    """The on-disk registry: artifacts plus a manifest naming the active and previous version of each kind."""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self._lock = threading.Lock()
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'models': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # Atomic replace so watchers never read a half-written manifest
+        os.replace(tmp, self.manifest_path)
+
+    def manifest_mtime(self):
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def path(self, kind, version):
+        entry = self.read_manifest()['models'].get(kind, {}).get('versions', {}).get(version)
+        if entry is None:
+            raise KeyError(f"No {kind} model version {version!r} in {self.manifest_path}")
+        return os.path.join(self.root, entry['path'])
+
+    def active(self, kind):
+        return self.read_manifest()['models'].get(kind, {}).get('active')
+
+    def versions(self, kind):
+        return self.read_manifest()['models'].get(kind, {}).get('versions', {})
+
+    def register(self, kind, version, artifact_path, activate=False):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown model kind: {kind}")
+        rel_path = os.path.join(kind, version, KINDS[kind])
+        dest = os.path.join(self.root, rel_path)
+        with self._lock:
+            manifest = self.read_manifest()
+            entry = manifest['models'].setdefault(kind, {'active': None, 'previous': None, 'versions': {}})
+            if version in entry['versions']:
+                raise ValueError(f"{kind} version {version!r} is already registered")
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copy2(artifact_path, dest)
+            entry['versions'][version] = {
+                'path': rel_path,
+                'registered': datetime.datetime.now().isoformat(timespec='seconds'),
+                'sha256': _sha256(dest),
+            }
+            if activate:
+                entry['previous'], entry['active'] = entry['active'], version
+            self._write_manifest(manifest)
+        return dest
+
+    def set_active(self, kind, version):
+        with self._lock:
+            manifest = self.read_manifest()
+            entry = manifest['models'].get(kind)
+            if entry is None or version not in entry['versions']:
+                raise KeyError(f"No {kind} model version {version!r} registered")
+            if entry['active'] != version:
+                entry['previous'], entry['active'] = entry['active'], version
+                self._write_manifest(manifest)
+        return version
+
+class ModelManager:
+    """Binds the registry to the live model holders and performs warm-up, checks and swaps."""
+
+    def __init__(self, registry, holders, sample_jobs, max_latency_ms=None, warmup_batch=32, replicas=None):
+        self.registry = registry
+        self.holders = holders            # kind -> object with a `model` attribute
+        self.sample_jobs = sample_jobs    # callable(n) -> list of job dicts
+        self.max_latency_ms = dict(DEFAULT_MAX_LATENCY_MS, **(max_latency_ms or {}))
+        self.warmup_batch = warmup_batch
+        # Optional copies of the models in other processes, e.g. the shard workers; an object with
+        # prepare(kind, path, jobs) -> {replica: p95 ms}, abort(kind), commit(kind, path), rollback(kind, path)
+        self.replicas = replicas
+        self.loaded = {kind: {'version': None, 'path': None, 'previous': None} for kind in holders}
+        self.history = []
+        self._swap_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _warm_up(self, kind, model, jobs):
+        """Warm up the candidate through a shallow copy of the live holder; returns p95 ms."""
+        import copy
+        probe = copy.copy(self.holders[kind])
+        probe.model = model
+        return warm_up(kind, probe, jobs)
+
+    def _check_latency(self, kind, p95_ms, where):
+        if p95_ms > self.max_latency_ms[kind]:
+            raise ModelSwapError(f"{where} p95 {p95_ms:.1f}ms exceeds budget {self.max_latency_ms[kind]:.1f}ms")
+
+    def _register_baseline(self, kind):
+        """Give the startup model a registered version so the swap away from it can be rolled back and persisted."""
+        state = self.loaded[kind]
+        if state['version'] is not None:
+            return
+        artifact = getattr(self.holders[kind], 'model_path', None) or default_artifact(kind)
+        digest = _sha256(artifact)
+        versions = self.registry.versions(kind)
+        version = BASELINE_VERSION
+        if version in versions and versions[version].get('sha256') != digest:
+            # The default artifact changed since the baseline was registered; name this one by content
+            version = f"{BASELINE_VERSION}-{digest[:12]}"
+        if version not in versions:
+            try:
+                self.registry.register(kind, version, artifact, activate=self.registry.active(kind) is None)
+            except ValueError:
+                pass  # registered by another API worker in the meantime
+        state['version'], state['path'] = version, self.registry.path(kind, version)
+
+    def _swap(self, kind, version, path, model, **extra):
+        if self.replicas is not None:
+            self.replicas.commit(kind, path)
+        holder = self.holders[kind]
+        state = self.loaded[kind]
+        state['previous'] = {'version': state['version'], 'path': state['path'], 'model': holder.model}
+        holder.model = model
+        if hasattr(holder, 'model_path'):
+            holder.model_path = path
+        state['version'], state['path'] = version, path
+        self._record(kind, version, 'swapped', **extra)
+
+    def _record(self, kind, version, status, **extra):
+        event = dict(kind=kind, version=version, status=status,
+                     time=datetime.datetime.now().isoformat(timespec='seconds'), **extra)
+        self.history.append(event)
+        del self.history[:-50]
+        logger.info(f"Model {kind} {version}: {status} {extra if extra else ''}")
+        return event
+
+    def load_version(self, kind, version):
+        """Load, warm up and latency-check a version here and in every replica, then swap it in everywhere."""
+        with self._swap_lock:
+            try:
+                # The startup model may itself be the requested version, e.g. when baseline is active
+                self._register_baseline(kind)
+            except Exception as e:
+                return self._record(kind, version, 'rejected',
+                                    error=f"Registering the startup model failed: {type(e).__name__}: {e}")
+            if self.loaded[kind]['version'] == version:
+                return self._record(kind, version, 'already active')
+            path = self.registry.path(kind, version)
+            start = time.perf_counter()
+            p95_ms, replica_p95_ms = None, {}
+            try:
+                jobs = self.sample_jobs(self.warmup_batch)
+                if not jobs:
+                    raise ModelSwapError("No sample jobs available for warm-up")
+                model = load_model(kind, path)
+                p95_ms = self._warm_up(kind, model, jobs)
+                self._check_latency(kind, p95_ms, 'local')
+                if self.replicas is not None:
+                    replica_p95_ms = self.replicas.prepare(kind, path, jobs)
+                    for replica, replica_ms in replica_p95_ms.items():
+                        self._check_latency(kind, replica_ms, f"replica {replica}")
+            except Exception as e:
+                if self.replicas is not None:
+                    self.replicas.abort(kind)
+                return self._record(kind, version, 'rejected', p95_ms=p95_ms, replica_p95_ms=replica_p95_ms,
+                                    error=f"{type(e).__name__}: {e}")
+            self._swap(kind, version, path, model, p95_ms=p95_ms, replica_p95_ms=replica_p95_ms)
+            return dict(self.history[-1], load_sec=time.perf_counter() - start)
+
+    def activate(self, kind, version):
+        """Load and swap in a version, and only then mark it active so other workers follow."""
+        result = self.load_version(kind, version)
+        if result['status'] in ('swapped', 'already active'):
+            self.registry.set_active(kind, version)
+        return result
+
+    def rollback(self, kind):
+        """Swap the previous in-memory model back in instantly and mark it active in the manifest."""
+        with self._swap_lock:
+            state = self.loaded[kind]
+            previous = state['previous']
+            if previous is None:
+                raise ModelSwapError(f"No previous {kind} model to roll back to")
+            if self.replicas is not None:
+                self.replicas.rollback(kind, previous['path'])
+            holder = self.holders[kind]
+            state['previous'] = {'version': state['version'], 'path': state['path'], 'model': holder.model}
+            holder.model = previous['model']
+            if hasattr(holder, 'model_path'):
+                holder.model_path = previous['path']
+            state['version'], state['path'] = previous['version'], previous['path']
+            self.registry.set_active(kind, previous['version'])
+            return self._record(kind, previous['version'], 'rolled back')
+
+    def sync(self):
+        """Bring every live model in line with the manifest's active versions."""
+        results = []
+        for kind in self.holders:
+            version = self.registry.active(kind)
+            if version is not None and version != self.loaded[kind]['version']:
+                results.append(self.load_version(kind, version))
+        return results
+
+    def sync_in_background(self):
+        threading.Thread(target=self.sync, name='model-sync', daemon=True).start()
+
+    def watch(self, interval=10.0):
+        """Poll the manifest and sync whenever it changes (covers edits by other API workers)."""
+        def loop():
+            last = None
+            while not self._stop.wait(interval):
+                mtime = self.registry.manifest_mtime()
+                if mtime is not None and mtime != last:
+                    last = mtime
+                    try:
+                        self.sync()
+                    except Exception as e:
+                        logger.error(f"Model registry sync failed: {e}")
+        self._watcher = threading.Thread(target=loop, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {
+            'registry': self.registry.read_manifest(),
+            'loaded': {kind: {'version': s['version'], 'path': s['path'],
+                              'previous': s['previous']['version'] if s['previous'] else None}
+                       for kind, s in self.loaded.items()},
+            'history': list(self.history),
+        }
+
+if __name__ == "__main__":
+    # python -m services.model_registry register cpu v2 /path/to/xgb_runtime_model.joblib --activate
+    # python -m services.model_registry activate cpu v1
+    import argparse
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry")
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    sub = parser.add_subparsers(dest="command", required=True)
+    reg = sub.add_parser("register")
+    reg.add_argument("kind", choices=list(KINDS))
+    reg.add_argument("version")
+    reg.add_argument("artifact")
+    reg.add_argument("--activate", action="store_true")
+    act = sub.add_parser("activate")
+    act.add_argument("kind", choices=list(KINDS))
+    act.add_argument("version")
+    sub.add_parser("show")
+    args = parser.parse_args()
+    registry = ModelRegistry(args.root)
+    if args.command == "register":
+        print(registry.register(args.kind, args.version, args.artifact, activate=args.activate))
+    elif args.command == "activate":
+        registry.set_active(args.kind, args.version)
+    print(json.dumps(registry.read_manifest(), indent=2))
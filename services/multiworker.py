@@ -0,0 +1,186 @@
+# multiworker.py
+# Helpers for running the API as several forked workers: file-lock leader election (so exactly
+# one worker runs the poller), forwarding of admin calls to the leader and per-process memory reporting.
+import fcntl
+import json
+import logging
+import os
+import socket
+import threading
+
+logger = logging.getLogger("multiworker")
+
+class LeaderLock:
+    """Non-blocking flock on a shared file; whoever holds it is the leader until their process exits.
+
+    The kernel drops the lock when the holder dies, so a surviving worker takes over on its next attempt.
+    Must be created after fork: flock is shared between processes that inherit the same open file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    @property
+    def is_leader(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        # Record the leader's pid for status reporting
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def leader_pid(self):
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+def run_when_leader(lock, on_elected, stop_event, retry_interval=5.0):
+    """Try to become leader now and then every retry_interval seconds; call on_elected() once elected."""
+    def loop():
+        while not stop_event.is_set():
+            if lock.try_acquire():
+                logger.info(f"Worker {os.getpid()} elected leader via {lock.path}")
+                on_elected()
+                return
+            stop_event.wait(retry_interval)
+    if lock.try_acquire():
+        logger.info(f"Worker {os.getpid()} elected leader via {lock.path}")
+        on_elected()
+        return
+    threading.Thread(target=loop, name='leader-election', daemon=True).start()
+
+class LeaderUnavailable(RuntimeError):
+    pass
+
+def _read_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+class LeaderControl:
+    """Runs named admin calls in the poller leader: directly when this process leads, otherwise over a
+    Unix socket the leader serves next to its lock file. One JSON request and reply per connection."""
+
+    def __init__(self, lock, path=None, timeout=10.0):
+        self.lock = lock
+        self.path = path or os.path.abspath(lock.path) + '.sock'
+        self.timeout = timeout
+        self.handlers = {}
+        self._server = None
+
+    def register(self, name, handler):
+        self.handlers[name] = handler
+        return handler
+
+    def call(self, name, **params):
+        if self.lock.is_leader:
+            return self.handlers[name](**params)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+                sock.sendall(json.dumps({'name': name, 'params': params}).encode())
+                sock.shutdown(socket.SHUT_WR)
+                reply = json.loads(_read_all(sock))
+        except (OSError, ValueError) as e:
+            raise LeaderUnavailable(f"Poller leader not reachable via {self.path}: {e}")
+        if 'error' in reply:
+            raise RuntimeError(f"Poller leader failed {name}: {reply['error']}")
+        return reply['result']
+
+    def serve(self):
+        """Accept calls from the other workers; only the leader calls this."""
+        try:
+            os.unlink(self.path)  # left behind by a previous leader
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(16)
+        self._server = server
+        threading.Thread(target=self._serve, name='leader-control', daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return  # closed
+            with conn:
+                try:
+                    conn.settimeout(self.timeout)
+                    request = json.loads(_read_all(conn))
+                    reply = {'result': self.handlers[request['name']](**request.get('params', {}))}
+                except Exception as e:
+                    reply = {'error': f"{type(e).__name__}: {e}"}
+                try:
+                    conn.sendall(json.dumps(reply, default=str).encode())
+                except OSError:
+                    pass
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+def process_memory(pid):
+    """RSS and, where the kernel provides it, PSS/shared/private memory of a process in MB."""
+    stats = {'pid': pid}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+        stats['rss_mb'] = fields.get('Rss', 0) / 1024
+        stats['pss_mb'] = fields.get('Pss', 0) / 1024
+        stats['shared_mb'] = (fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)) / 1024
+        stats['private_mb'] = (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024
+        return stats
+    except OSError:
+        pass
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            pages = int(f.read().split()[1])
+        stats['rss_mb'] = pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in KB on Linux; only available for ourselves
+        if pid == os.getpid():
+            stats['rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return stats
+
+def child_pids(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
@@ -0,0 +1,195 @@
+# profiler.py
+# On-demand profiling of poll cycles and API requests.
+# Disarmed by default: callers check `profiler.armed` (a plain attribute) before doing anything else,
+# so the profiler costs nothing until it is armed via the admin endpoint or the service config.
+import cProfile
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger("profiler")
+
+MODES = ('sample', 'cprofile')
+TARGETS = ('cycle', 'request')
+
+class StackSampler:
+    """Statistical sampler that records collapsed stacks ("a;b;c count"), the flamegraph.pl/speedscope input format."""
+
+    def __init__(self, interval=0.005, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name='profiler-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class ProfilingController:
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.armed = False
+        self.remaining = {target: 0 for target in TARGETS}
+        self.mode = 'sample'
+        self.sample_interval = 0.005
+        self.trace_memory = False
+        self.written = []
+        self._lock = threading.Lock()
+        self._busy = threading.Lock()
+        self._started_tracemalloc = False
+
+    def arm(self, cycles=0, requests=0, mode='sample', trace_memory=False, sample_interval_ms=5):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        with self._lock:
+            self.remaining = {'cycle': max(0, int(cycles)), 'request': max(0, int(requests))}
+            self.mode = mode
+            self.sample_interval = sample_interval_ms / 1000.0
+            self.trace_memory = trace_memory
+            if trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+                self._started_tracemalloc = True
+            self.armed = any(self.remaining.values())
+        logger.info(f"Profiling armed: cycles={cycles}, requests={requests}, mode={mode}, tracemalloc={trace_memory}")
+        return self.status()
+
+    def disarm(self):
+        with self._lock:
+            self.remaining = {target: 0 for target in TARGETS}
+            self.armed = False
+            self._stop_tracemalloc()
+        return self.status()
+
+    def status(self):
+        return {
+            'armed': self.armed,
+            'remaining': dict(self.remaining),
+            'mode': self.mode,
+            'tracemalloc': self.trace_memory,
+            'output_dir': self.output_dir,
+            'written': list(self.written[-20:]),
+        }
+
+    def _stop_tracemalloc(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _claim(self, target):
+        # Only one profile at a time; concurrent requests simply run unprofiled
+        if not self._busy.acquire(blocking=False):
+            return False
+        with self._lock:
+            if self.remaining.get(target, 0) <= 0:
+                self._busy.release()
+                return False
+            self.remaining[target] -= 1
+        return True
+
+    def _release(self):
+        with self._lock:
+            if not any(self.remaining.values()):
+                self.armed = False
+                self._stop_tracemalloc()
+        self._busy.release()
+
+    def _write(self, filename, writer):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, filename)
+        writer(path)
+        self.written.append(path)
+        return path
+
+    def _start(self, target, name):
+        stamp = time.strftime('%Y%m%d-%H%M%S') + f"-{int(time.time() * 1000) % 1000:03d}"
+        # Sync request handlers run in the threadpool, so requests are always sampled across all threads
+        mode = self.mode if target == 'cycle' else 'sample'
+        run = {'base': f"{target}-{name}-{stamp}", 'mode': mode, 'start': time.perf_counter(), 'before': None}
+        if self.trace_memory and tracemalloc.is_tracing():
+            run['before'] = tracemalloc.take_snapshot()
+        if mode == 'cprofile':
+            run['profile'] = cProfile.Profile()
+            run['profile'].enable()
+        else:
+            run['sampler'] = StackSampler(self.sample_interval, {threading.get_ident()} if target == 'cycle' else None)
+            run['sampler'].start()
+        return run
+
+    def _finish(self, run):
+        elapsed = time.perf_counter() - run['start']
+        base = run['base']
+        try:
+            if run['mode'] == 'cprofile':
+                run['profile'].disable()
+                self._write(base + '.prof', run['profile'].dump_stats)
+            else:
+                run['sampler'].stop()
+                self._write(base + '.folded', run['sampler'].write)
+            before = run['before']
+            if before is not None and tracemalloc.is_tracing():
+                after = tracemalloc.take_snapshot()
+                self._write(base + '.tracemalloc.snapshot', after.dump)
+                self._write(base + '.tracemalloc.txt', lambda path: _write_memory_diff(path, before, after))
+            logger.info(f"Profiled {base} in {elapsed:.3f}s")
+        except Exception as e:
+            logger.error(f"Failed to write profile {base}: {e}")
+        finally:
+            self._release()
+
+    def run(self, target, name, fn, *args, **kwargs):
+        """Run fn, profiling it if a profile for this target is still pending."""
+        if not self._claim(target):
+            return fn(*args, **kwargs)
+        run = self._start(target, name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._finish(run)
+
+    async def run_async(self, target, name, coro_fn, *args, **kwargs):
+        """Async variant of run() for the HTTP middleware."""
+        if not self._claim(target):
+            return await coro_fn(*args, **kwargs)
+        run = self._start(target, name)
+        try:
+            return await coro_fn(*args, **kwargs)
+        finally:
+            self._finish(run)
+
+def _write_memory_diff(path, before, after, limit=50):
+    with open(path, 'w') as f:
+        f.write(f"# Top {limit} allocation sites by size delta\n")
+        for stat in after.compare_to(before, 'lineno')[:limit]:
+            f.write(f"{stat}\n")
+        f.write(f"\n# Top {limit} allocation sites by current size\n")
+        for stat in after.statistics('lineno')[:limit]:
+            f.write(f"{stat}\n")
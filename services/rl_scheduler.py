@@ -5,6 +5,9 @@ from stable_baselines3 import PPO
 import numpy as np
 
 class RLScheduler:
+    # Jobs per policy observation: 10 jobs x 4 features, padded to the trained 42-float input
+    MAX_JOBS = 10
+
     def __init__(self, model_path=None):
         if model_path is None:
             model_path = os.path.join(os.path.dirname(__file__), '../models/ppo_hpc_scheduler.zip')
@@ -12,9 +15,15 @@ class RLScheduler:
         self.model = PPO.load(self.model_path)
 
     def decide(self, jobs, cluster_state):
+        # The policy observes at most MAX_JOBS jobs, so larger batches are decided window by window
+        for start in range(0, len(jobs), self.MAX_JOBS):
+            self._decide_window(jobs[start:start + self.MAX_JOBS], cluster_state)
+        return jobs
+
+    def _decide_window(self, jobs, cluster_state):
         # Prepare state for PPO: flatten job features into a single array
         # For simplicity, use [pred_cpu_cores, pred_mem_gb, est_run_time, state] for each job
-        max_jobs = 10
+        max_jobs = self.MAX_JOBS
         features_per_job = 4
         obs_len = 42
         job_features = []
@@ -0,0 +1,293 @@
+# sharded_pipeline.py
+# Partition-sharded predict/decide workers.
+# Jobs are routed by partition to a fixed pool of worker processes; each worker owns its own
+# predictors and RL scheduler. predict_and_decide() decides each partition's jobs as a separate batch in
+# both the serial and the sharded path, so sharding only runs different partitions in parallel. The RL policy only sees the jobs it is given, so no cluster
+# state is carried between cycles. Results are merged back into the original job order for a single
+# DB write.
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+import zlib
+
+from services.pipeline import partition_key, predict_and_decide
+
+logger = logging.getLogger("sharded_pipeline")
+
+def shard_for(partition, n_shards):
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(str(partition or 'default').encode()) % n_shards
+
+def _prepare_loop(ctrl, factories, candidates):
+    # Runs on its own thread so a shard keeps serving cycles while it loads and warms up a new version
+    from services.model_registry import warm_up
+    while True:
+        try:
+            command, payload = ctrl.recv()
+        except (EOFError, OSError):
+            return
+        if command == 'abort':
+            candidates.pop(payload, None)
+            continue
+        token, kind, path, jobs = payload
+        try:
+            holder = factories[kind](path)
+            p95_ms = warm_up(kind, holder, jobs)
+            candidates[kind] = (path, holder)
+            reply = (token, 'ok', p95_ms)
+        except Exception as e:
+            reply = (token, 'error', f"{type(e).__name__}: {e}")
+        try:
+            ctrl.send(reply)
+        except OSError:
+            return
+
+def _shard_main(conn, ctrl, shard_id, model_paths):
+    # Imported here so the parent does not need the models to create the pool
+    from services.cpu_predictor import CPUPredictor
+    from services.mem_predictor import MemPredictor
+    from services.rl_scheduler import RLScheduler
+    factories = {'cpu': CPUPredictor, 'mem': MemPredictor, 'rl': RLScheduler}
+    paths = dict(model_paths)
+    models = {kind: factory(paths.get(kind)) for kind, factory in factories.items()}
+    previous = {}    # kind -> (path, model) swapped out by the last commit, kept for instant rollback
+    candidates = {}  # kind -> (path, warmed-up model) waiting for commit
+    threading.Thread(target=_prepare_loop, args=(ctrl, factories, candidates), daemon=True).start()
+    conn.send(('ready', shard_id))
+    while True:
+        try:
+            command, payload = conn.recv()
+        except EOFError:
+            break
+        if command == 'stop':
+            break
+        if command in ('commit', 'rollback'):
+            kind, path = payload
+            try:
+                # A shard started after prepare has no candidate, and one restarted since the last commit
+                # has no previous model; both load the version from disk instead. The previous model is the
+                # one the caller rolls back to even when it was loaded at startup under its default path.
+                if command == 'commit':
+                    stash = candidates.pop(kind, None)
+                    model = stash[1] if stash and stash[0] == path else factories[kind](path)
+                else:
+                    stash = previous.pop(kind, None)
+                    model = stash[1] if stash else factories[kind](path)
+                previous[kind] = (paths.get(kind), models[kind])
+                paths[kind], models[kind] = path, model
+                conn.send(('ok', None))
+            except Exception as e:
+                conn.send(('error', f"{type(e).__name__}: {e}"))
+            continue
+        try:
+            jobs, timings = predict_and_decide([job for _, job in payload], models['cpu'], models['mem'], models['rl'])
+            conn.send(('ok', (list(zip((idx for idx, _ in payload), jobs)), timings)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+    conn.close()
+
+class ShardedPipeline:
+    def __init__(self, n_workers=4, model_paths=None, start_timeout=120.0, process_timeout=60.0,
+                 reload_timeout=120.0):
+        self.n_workers = n_workers
+        self.model_paths = model_paths or {}
+        self.start_timeout = start_timeout
+        self.process_timeout = process_timeout
+        self.reload_timeout = reload_timeout
+        # spawn, not fork: the parent may already hold torch/XGBoost thread pools
+        self._ctx = multiprocessing.get_context('spawn')
+        self._workers = [None] * n_workers
+        # Only the API worker that runs the poller starts its pool; model swaps in the others just record paths
+        self._started = False
+        # Serializes process(), commit() and rollback(), which share the worker pipes
+        self._lock = threading.Lock()
+        # prepare() and abort() use the separate control pipes, so cycles keep running during a warm-up
+        self._ctrl_lock = threading.Lock()
+        self._tokens = itertools.count()
+
+    def _start_worker(self, shard_id):
+        parent_conn, child_conn = self._ctx.Pipe()
+        parent_ctrl, child_ctrl = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_shard_main, args=(child_conn, child_ctrl, shard_id, self.model_paths),
+                                 name=f'shard-{shard_id}', daemon=True)
+        proc.start()
+        child_conn.close()
+        child_ctrl.close()
+        if not parent_conn.poll(self.start_timeout):
+            proc.kill()
+            raise RuntimeError(f"Shard {shard_id} did not start within {self.start_timeout}s")
+        parent_conn.recv()
+        self._workers[shard_id] = (proc, parent_conn, parent_ctrl)
+        logger.info(f"Started shard worker {shard_id} (pid {proc.pid})")
+        return self._workers[shard_id]
+
+    def _kill_worker(self, shard_id):
+        # A hung or dead shard is replaced by _start_all() at the start of the next cycle
+        proc, conn, ctrl = self._workers[shard_id]
+        self._workers[shard_id] = None
+        proc.kill()
+        proc.join(5.0)
+        conn.close()
+        ctrl.close()
+
+    def _receive(self, shard_id, deadline):
+        """Wait for one shard's reply until deadline; kills the shard and returns an error on timeout."""
+        proc, conn, _ = self._workers[shard_id]
+        try:
+            if conn.poll(max(0.0, deadline - time.monotonic())):
+                return conn.recv()
+            error = f"pid {proc.pid} timed out and was killed"
+        except (EOFError, OSError):
+            error = f"pid {proc.pid} died"
+        self._kill_worker(shard_id)
+        return 'error', error
+
+    def start(self):
+        with self._lock:
+            return self._start_all()
+
+    def _start_all(self):
+        self._started = True
+        for shard_id in range(self.n_workers):
+            if self._workers[shard_id] is None:
+                self._start_worker(shard_id)
+        return self
+
+    def process(self, jobs):
+        """Predict and decide jobs across shards; returns (jobs in input order, timings)."""
+        with self._lock:
+            self._start_all()
+            return self._process(jobs)
+
+    def _process(self, jobs):
+        routed = {}
+        for idx, job in enumerate(jobs):
+            routed.setdefault(shard_for(partition_key(job), self.n_workers), []).append((idx, job))
+        merged = [None] * len(jobs)
+        timings = {'cpu': [], 'mem': [], 'rl': []}
+        errors = []
+        # Fan out to every shard first so they work in parallel, then gather
+        for shard_id, items in list(routed.items()):
+            try:
+                self._workers[shard_id][1].send(('process', items))
+            except OSError:
+                errors.append(f"shard {shard_id}: pid {self._workers[shard_id][0].pid} died")
+                self._kill_worker(shard_id)
+                del routed[shard_id]
+        deadline = time.monotonic() + self.process_timeout
+        for shard_id in routed:
+            status, payload = self._receive(shard_id, deadline)
+            if status != 'ok':
+                errors.append(f"shard {shard_id}: {payload}")
+                continue
+            results, t = payload
+            for idx, job in results:
+                merged[idx] = job
+            for key in timings:
+                timings[key].extend(t[key])
+        if errors:
+            raise RuntimeError("Sharded pipeline failed: " + "; ".join(errors))
+        return merged, timings
+
+    def prepare(self, kind, path, jobs):
+        """Load a version next to the live model in every shard and warm it up on jobs.
+
+        Returns {shard_id: p95 ms}, which is empty for a pool that was never started. Raises RuntimeError if
+        any shard fails or times out; the caller then calls abort(). Nothing is swapped until commit().
+        """
+        with self._lock:
+            if not self._started:
+                return {}
+            self._start_all()
+            workers = list(enumerate(self._workers))
+        with self._ctrl_lock:
+            token = next(self._tokens)
+            errors, p95_ms = [], {}
+            for shard_id, (proc, _, ctrl) in workers:
+                try:
+                    ctrl.send(('prepare', (token, kind, path, jobs)))
+                except (OSError, ValueError):
+                    errors.append(f"shard {shard_id}: pid {proc.pid} died")
+            deadline = time.monotonic() + self.reload_timeout
+            for shard_id, (proc, _, ctrl) in workers:
+                if any(e.startswith(f"shard {shard_id}:") for e in errors):
+                    continue
+                try:
+                    while True:
+                        if not ctrl.poll(max(0.0, deadline - time.monotonic())):
+                            errors.append(f"shard {shard_id}: pid {proc.pid} timed out")
+                            break
+                        # Replies to an earlier prepare that timed out are stale
+                        reply_token, status, payload = ctrl.recv()
+                        if reply_token != token:
+                            continue
+                        if status == 'ok':
+                            p95_ms[shard_id] = payload
+                        else:
+                            errors.append(f"shard {shard_id}: {payload}")
+                        break
+                except (EOFError, OSError, ValueError):
+                    errors.append(f"shard {shard_id}: pid {proc.pid} died")
+            if errors:
+                raise RuntimeError(f"Preparing {kind} model in shards failed: " + "; ".join(errors))
+            return p95_ms
+
+    def abort(self, kind):
+        """Drop the candidates left by prepare()."""
+        with self._ctrl_lock:
+            for worker in self._workers:
+                if worker is None:
+                    continue
+                try:
+                    worker[2].send(('abort', kind))
+                except (OSError, ValueError):
+                    pass
+
+    def commit(self, kind, path):
+        """Swap every shard to the version prepared at path; shards started later load it too."""
+        self._switch('commit', kind, path)
+
+    def rollback(self, kind, path):
+        """Swap every shard back to the model it replaced at the last commit, which must be the one at path."""
+        self._switch('rollback', kind, path)
+
+    def _switch(self, command, kind, path):
+        with self._lock:
+            self.model_paths = dict(self.model_paths, **{kind: path})
+            for shard_id, worker in enumerate(self._workers):
+                if worker is None:
+                    continue
+                proc, conn, _ = worker
+                try:
+                    conn.send((command, (kind, path)))
+                except OSError:
+                    status, payload = 'error', f"pid {proc.pid} died"
+                else:
+                    status, payload = self._receive(shard_id, time.monotonic() + self.reload_timeout)
+                if status != 'ok':
+                    # Never leave a shard on the old version: replace it so it starts from model_paths
+                    logger.warning(f"Shard {shard_id} failed to {command} {kind} model ({payload}); restarting it")
+                    if self._workers[shard_id] is not None:
+                        self._kill_worker(shard_id)
+
+    def close(self, timeout=5.0):
+        with self._lock:
+            self._close(timeout)
+
+    def _close(self, timeout):
+        self._started = False
+        for shard_id, worker in enumerate(self._workers):
+            if worker is None:
+                continue
+            proc, conn, ctrl = worker
+            try:
+                conn.send(('stop', None))
+            except (BrokenPipeError, OSError):
+                pass
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.kill()
+            ctrl.close()
+            self._workers[shard_id] = None
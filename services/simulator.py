@@ -3,15 +3,16 @@
 
 import logging
 
-def simulate(jobs, cluster_state):
-    # Simulate a simple bin-packing cluster with 64 CPUs, 256GB RAM
-    logger = logging.getLogger("simulator")
-    total_cpus = 64
-    total_mem = 256.0
+TOTAL_CPUS = 64
+TOTAL_MEM_GB = 256.0
+
+def _pack(jobs):
+    """Pack jobs onto the simulated cluster in order; yields (outcome, used_cpus) after each job.
+
+    outcome is 'started' for a RUN job that fits, 'waiting' for one that does not and None otherwise.
+    """
     used_cpus = 0
     used_mem = 0.0
-    wait_times = []
-    running_jobs = 0
     for job in jobs:
         # Use predicted values if available, else fallback to requested
         cpu_cores = job.get('pred_cpu_cores')
@@ -21,17 +22,31 @@ def simulate(jobs, cluster_state):
         if mem_gb is None:
             mem_gb = job.get('req_mem_gb', 0.0)
         # Only consider jobs with RL action RUN
-        if job.get('rl_action', 'RUN') == 'RUN' and job['state'] == 'PENDING':
-            if used_cpus + cpu_cores <= total_cpus and used_mem + mem_gb <= total_mem:
+        if job.get('rl_action', 'RUN') == 'RUN' and job.get('state') == 'PENDING':
+            if used_cpus + cpu_cores <= TOTAL_CPUS and used_mem + mem_gb <= TOTAL_MEM_GB:
                 used_cpus += cpu_cores
                 used_mem += mem_gb
-                running_jobs += 1
-                wait_times.append(0)  # Assume instant start for simplicity
+                yield 'started', used_cpus
             else:
-                wait_times.append(10)  # Simulate wait if not enough resources
+                yield 'waiting', used_cpus
+        else:
+            yield None, used_cpus
+
+def simulate(jobs, cluster_state):
+    # Simulate a simple bin-packing cluster with 64 CPUs, 256GB RAM
+    logger = logging.getLogger("simulator")
+    used_cpus = 0
+    wait_times = []
+    running_jobs = 0
+    for outcome, used_cpus in _pack(jobs):
+        if outcome == 'started':
+            running_jobs += 1
+            wait_times.append(0)  # Assume instant start for simplicity
+        elif outcome == 'waiting':
+            wait_times.append(10)  # Simulate wait if not enough resources
         else:
             wait_times.append(0)
-    utilization = used_cpus / total_cpus if total_cpus else 0
+    utilization = used_cpus / TOTAL_CPUS if TOTAL_CPUS else 0
     avg_wait_time = sum(wait_times) / len(wait_times) if wait_times else 0
     throughput = running_jobs
     logger.info(f"Simulated utilization: {utilization:.2f}, avg_wait: {avg_wait_time}, throughput: {throughput}")
@@ -41,3 +56,11 @@ def simulate(jobs, cluster_state):
         "throughput": throughput
     }
     return metrics
+
+def utilization_steps(jobs):
+    """CPU utilization of the simulated cluster after each job's decision, packing jobs as simulate() does.
+
+    Entry i is the utilization after job i; the utilization before job i is entry i-1 (0.0 for the first).
+    The last entry is simulate()'s utilization for the same jobs.
+    """
+    return [used_cpus / TOTAL_CPUS for _, used_cpus in _pack(jobs)]
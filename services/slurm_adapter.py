@@ -0,0 +1,256 @@
+# slurm_adapter.py
+# Asyncio SLURM adapter: polls squeue/sacct as JSON subprocesses and emits job change sets.
+#
+# A full `squeue --json` snapshot is only taken on the first poll and every `resync_every` polls
+# afterwards; in between, `sacct --json --starttime <cursor>` asks slurmdbd for jobs that changed since
+# the previous poll, so slurmctld is not hit with a full queue dump every few seconds.
+# sacct may return a superset of the changed jobs; anything whose tracked fields did not change is dropped
+# by the diff. A resync also runs the sacct delta since the cursor, because jobs that ended since the
+# previous poll are already gone from squeue and only sacct knows how they finished.
+import asyncio
+import datetime
+import json
+import logging
+import shlex
+import time
+
+logger = logging.getLogger("slurm_adapter")
+
+ACTIVE_STATES = ('PENDING', 'RUNNING', 'SUSPENDED', 'CONFIGURING', 'COMPLETING', 'REQUEUED', 'RESIZING')
+TERMINAL_STATES = ('COMPLETED', 'CANCELLED', 'FAILED', 'TIMEOUT', 'NODE_FAIL', 'PREEMPTED', 'BOOT_FAIL',
+                   'DEADLINE', 'OUT_OF_MEMORY')
+# Assigned to tracked jobs that left the queue without any accounting record of how they ended
+VANISHED_STATE = 'COMPLETED'
+# Fields whose change counts as a job update
+TRACKED_FIELDS = ('state', 'partition', 'req_cpus', 'req_mem_gb', 'est_run_time')
+
+class SlurmCommandError(RuntimeError):
+    pass
+
+def _number(value, default=None):
+    # SLURM >= 23.02 wraps numbers as {"set": bool, "infinite": bool, "number": n}
+    if isinstance(value, dict):
+        if not value.get('set', True) or value.get('infinite', False):
+            return default
+        value = value.get('number', default)
+    if isinstance(value, list):
+        value = value[0] if value else default
+    return default if value is None else value
+
+def _state(value):
+    if isinstance(value, dict):
+        value = value.get('current')
+    if isinstance(value, list):
+        value = value[0] if value else 'UNKNOWN'
+    # sacct reports e.g. "CANCELLED by 1000"
+    return str(value or 'UNKNOWN').split()[0].upper()
+
+def normalize_job(raw, source):
+    """Convert a squeue/sacct JSON job record into the job dict used by the pipeline."""
+    if source == 'squeue':
+        state = _state(raw.get('job_state'))
+        user = raw.get('user_name') or str(raw.get('user_id', 0))
+        cpus = _number(raw.get('cpus'), None) or _number(raw.get('num_cpus'), 1)
+        mem_mb = _number(raw.get('memory_per_node'), None)
+        if mem_mb is None:
+            mem_mb = (_number(raw.get('memory_per_cpu'), 0) or 0) * cpus
+        limit_min = _number(raw.get('time_limit'), None)
+        submit_time = _number(raw.get('submit_time'), 0)
+    else:
+        state = _state(raw.get('state'))
+        user = raw.get('user') or str(raw.get('user_id', 0))
+        required = raw.get('required') or {}
+        cpus = _number(required.get('CPUs'), None) or _number(raw.get('cpus'), 1)
+        mem_mb = _number(required.get('memory_per_node'), None)
+        if mem_mb is None:
+            mem_mb = _number(required.get('memory'), 0) or 0
+        times = raw.get('time') or {}
+        limit_min = _number(times.get('limit'), None)
+        # sacct calls it submission; older or third-party emitters use submit
+        submit_time = _number(times.get('submission'), None) or _number(times.get('submit'), 0)
+    user_id = _number(raw.get('user_id'), 0) or 0
+    est_run_time = int(limit_min * 60) if limit_min else 60
+    req_mem_gb = float(mem_mb or 0) / 1024
+    submitted = datetime.datetime.fromtimestamp(submit_time or 0)
+    return {
+        "job_id": int(raw['job_id']),
+        "user": user,
+        "user_id": int(user_id),
+        "state": state,
+        "req_cpus": int(cpus),
+        "req_mem_gb": req_mem_gb,
+        "requested_mem": req_mem_gb,
+        "requested_time": est_run_time,
+        "partition": raw.get('partition') or 'default',
+        "est_run_time": est_run_time,
+        "submit_time": int(submit_time or 0),
+        "hour_of_day": submitted.hour,
+        "day_of_week": submitted.weekday(),
+        "queue_name": 0,
+        "group_id": 0,
+        "executable_num": 0,
+        "pred_cpu_cores": int(cpus),
+        "pred_mem_gb": req_mem_gb,
+        "rl_action": None
+    }
+
+class ChangeSet:
+    def __init__(self, full_sync=False, cursor=None):
+        self.full_sync = full_sync
+        self.cursor = cursor  # where the next delta starts once this change set is committed
+        self.added = []
+        self.changed = []    # (previous_state, job)
+        self.finished = []   # jobs that reached a terminal state or left the queue (also listed in changed)
+        self.updates = {}    # job_id -> job to track, or None to forget; applied to known on commit
+
+    @property
+    def jobs(self):
+        """Jobs that are new or whose tracked fields changed (including ones that just finished)."""
+        return self.added + [job for _, job in self.changed]
+
+    def __len__(self):
+        # finished jobs are also in changed, so count each job once
+        return len(self.jobs)
+
+    def __repr__(self):
+        return (f"ChangeSet(full_sync={self.full_sync}, added={len(self.added)}, "
+                f"changed={len(self.changed)}, finished={len(self.finished)})")
+
+class SlurmAdapter:
+    def __init__(self, squeue_cmd='squeue', sacct_cmd='sacct', timeout=10.0, resync_every=12, overlap_sec=5,
+                 clock=time.time):
+        self.squeue_cmd = shlex.split(squeue_cmd) if isinstance(squeue_cmd, str) else list(squeue_cmd)
+        self.sacct_cmd = shlex.split(sacct_cmd) if isinstance(sacct_cmd, str) else list(sacct_cmd)
+        self.timeout = timeout
+        self.resync_every = resync_every
+        self.overlap_sec = overlap_sec
+        self.clock = clock
+        self.known = {}
+        self.cursor = None
+        self.uncommitted = None
+        self.polls_since_sync = 0
+
+    async def _run_json(self, cmd):
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise SlurmCommandError(f"{cmd[0]} timed out after {self.timeout}s")
+        if proc.returncode != 0:
+            raise SlurmCommandError(f"{' '.join(cmd)} exited with {proc.returncode}: {stderr.decode(errors='replace').strip()}")
+        try:
+            return json.loads(stdout)
+        except ValueError as e:
+            raise SlurmCommandError(f"{cmd[0]} returned invalid JSON: {e}")
+
+    async def squeue(self):
+        data = await self._run_json(self.squeue_cmd + ['--json', '--states=' + ','.join(ACTIVE_STATES)])
+        return [normalize_job(raw, 'squeue') for raw in data.get('jobs', [])]
+
+    async def sacct(self, since, until):
+        fmt = '%Y-%m-%dT%H:%M:%S'
+        cmd = self.sacct_cmd + ['--json', '--allocations',
+                                '--starttime', time.strftime(fmt, time.localtime(since)),
+                                '--endtime', time.strftime(fmt, time.localtime(until))]
+        data = await self._run_json(cmd)
+        return [normalize_job(raw, 'sacct') for raw in data.get('jobs', [])]
+
+    def _diff(self, jobs, changes, full_sync):
+        seen = set()
+        for job in jobs:
+            seen.add(job['job_id'])
+            old = self.known.get(job['job_id'])
+            if old is None:
+                if job['state'] in TERMINAL_STATES:
+                    # Never saw it active; nothing to schedule
+                    continue
+                changes.added.append(job)
+            elif any(old[f] != job[f] for f in TRACKED_FIELDS):
+                changes.changed.append((old['state'], job))
+            else:
+                continue
+            if job['state'] in TERMINAL_STATES:
+                changes.updates[job['job_id']] = None
+                changes.finished.append(job)
+            else:
+                changes.updates[job['job_id']] = job
+        if full_sync:
+            for job_id, old in self.known.items():
+                if job_id not in seen:
+                    job = dict(old, state=VANISHED_STATE)
+                    changes.changed.append((old['state'], job))
+                    changes.finished.append(job)
+                    changes.updates[job_id] = None
+
+    async def poll(self):
+        """Fetch the changes since the last committed poll.
+
+        Nothing is marked as seen until commit(), so a change set the caller fails to store is
+        delivered again by the next poll.
+        """
+        now = self.clock()
+        full_sync = self.cursor is None or self.polls_since_sync >= self.resync_every
+        # Overlap covers clock skew with slurmdbd
+        changes = ChangeSet(full_sync=full_sync, cursor=now - self.overlap_sec)
+        if full_sync and self.cursor is None:
+            jobs = await self.squeue()
+        elif full_sync:
+            active, delta = await asyncio.gather(self.squeue(), self.sacct(self.cursor, now))
+            # squeue is authoritative for what is still queued; sacct supplies the final state of jobs
+            # that ended since the previous poll
+            merged = {job['job_id']: job for job in delta if job['state'] in TERMINAL_STATES}
+            merged.update((job['job_id'], job) for job in active)
+            jobs = list(merged.values())
+        else:
+            jobs = await self.sacct(self.cursor, now)
+        self._diff(jobs, changes, full_sync)
+        self.uncommitted = changes
+        logger.info(f"SLURM poll: {changes}")
+        return changes
+
+    def commit(self, changes=None):
+        """Mark a polled change set (default: the latest) as stored: track its jobs and advance the cursor."""
+        changes = changes or self.uncommitted
+        if changes is None:
+            return
+        for job_id, job in changes.updates.items():
+            if job is None:
+                self.known.pop(job_id, None)
+            else:
+                self.known[job_id] = job
+        self.polls_since_sync = 0 if changes.full_sync else self.polls_since_sync + 1
+        self.cursor = changes.cursor
+        if changes is self.uncommitted:
+            self.uncommitted = None
+
+    def poll_sync(self):
+        return asyncio.run(self.poll())
+
+if __name__ == "__main__":
+    # Smoke run against real or fake commands, e.g.
+    #   python -m services.slurm_adapter --squeue "python tools/fake_slurm.py --trace t.swf squeue" \
+    #       --sacct "python tools/fake_slurm.py --trace t.swf sacct"
+    import argparse
+    parser = argparse.ArgumentParser(description="Poll SLURM and print change sets")
+    parser.add_argument("--squeue", default="squeue")
+    parser.add_argument("--sacct", default="sacct")
+    parser.add_argument("--interval", type=float, default=5.0)
+    parser.add_argument("--polls", type=int, default=5)
+    parser.add_argument("--resync-every", type=int, default=12)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    adapter = SlurmAdapter(args.squeue, args.sacct, resync_every=args.resync_every)
+    for i in range(args.polls):
+        changes = adapter.poll_sync()
+        for job in changes.added:
+            print(f"+ {job['job_id']} {job['state']} {job['partition']}")
+        for old_state, job in changes.changed:
+            print(f"~ {job['job_id']} {old_state} -> {job['state']}")
+        for job in changes.finished:
+            print(f"- {job['job_id']} {job['state']}")
+        adapter.commit(changes)
+        if i + 1 < args.polls:
+            time.sleep(args.interval)
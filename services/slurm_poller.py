@@ -9,20 +9,27 @@ import os
 import pandas as pd
 import numpy as np
 import datetime
+import collections
+import math
+import sys
+# Running this file directly puts only services/ on sys.path
+sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
+from services.slurm_adapter import SlurmAdapter
 
 # Load config (mock/real mode)
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/service_config.yaml')
 if os.path.exists(CONFIG_PATH):
     with open(CONFIG_PATH) as f:
-        config = yaml.safe_load(f)
-    USE_MOCK = config.get('use_mock_slurm', True)
+        config = yaml.safe_load(f) or {}
 else:
-    USE_MOCK = True
+    config = {}
+USE_MOCK = config.get('use_mock_slurm', True)
 
 logger = logging.getLogger("slurm_poller")
 logging.basicConfig(level=logging.INFO)
 
-SWF_PATH = '/home/tobbaco-inspection-robot/InternProject/zchpc-ai-scheduler/data/RICC-2010-2.swf'
+SWF_PATH = config.get('swf_path', '/home/tobbaco-inspection-robot/InternProject/zchpc-ai-scheduler/data/RICC-2010-2.swf')
+POLL_BATCH_SIZE = config.get('poll_batch_size', 5)
 
 # Helper to parse SWF file and yield jobs in the required format
 class SWFJobFeeder:
@@ -96,18 +103,168 @@ class SWFJobFeeder:
         self.idx += n
         return jobs
 
-# Global feeder instance
-swf_feeder = SWFJobFeeder(SWF_PATH)
+# Replays a trace at its real submit-time spacing, compressed by a time-warp factor.
+# Jobs become due when their scaled submit offset has elapsed on the wall clock; at most
+# max_jobs_per_poll are handed out per poll (rate limit) and the backlog of due-but-unserved
+# jobs is capped at max_backlog, dropping the oldest (backpressure).
+class TraceReplayFeeder:
+    def __init__(self, jobs, time_warp=1.0, max_jobs_per_poll=100, max_backlog=1000, tick_sec=None,
+                 clock=time.monotonic):
+        if time_warp <= 0:
+            raise ValueError("time_warp must be positive")
+        self.jobs = sorted(jobs, key=lambda j: j['submit_time'])
+        self.time_warp = float(time_warp)
+        self.tick_sec = tick_sec
+        self.max_jobs_per_poll = max_jobs_per_poll
+        self.max_backlog = max_backlog
+        self.clock = clock
+        self.trace_start = self.jobs[0]['submit_time'] if self.jobs else 0
+        self.wall_start = None
+        self.idx = 0
+        self.backlog = collections.deque()
+        self.latencies = collections.deque(maxlen=100000)
+        self.polls = 0
+        self.emitted = 0
+        self.dropped_jobs = 0
+        self.dropped_cycles = 0
+        self.decided = 0
+
+    @property
+    def finished(self):
+        return self.idx >= len(self.jobs) and not self.backlog
+
+    def _due_time(self, job):
+        return self.wall_start + (job['submit_time'] - self.trace_start) / self.time_warp
+
+    def next_due_in(self):
+        """Seconds until the next trace job arrives (0 if jobs are already waiting)."""
+        if self.backlog or self.wall_start is None:
+            return 0.0
+        if self.idx >= len(self.jobs):
+            return None
+        return max(0.0, self._due_time(self.jobs[self.idx]) - self.clock())
+
+    def get_next_jobs(self, n=None):
+        now = self.clock()
+        if self.wall_start is None:
+            self.wall_start = now
+        self.polls += 1
+        while self.idx < len(self.jobs) and self._due_time(self.jobs[self.idx]) <= now:
+            job = self.jobs[self.idx]
+            self.backlog.append(dict(job, replay_arrival=self._due_time(job)))
+            self.idx += 1
+        overflow = len(self.backlog) - self.max_backlog
+        for _ in range(max(0, overflow)):
+            self.backlog.popleft()
+            self.dropped_jobs += 1
+        limit = self.max_jobs_per_poll if n is None else min(n, self.max_jobs_per_poll)
+        jobs = [self.backlog.popleft() for _ in range(min(limit, len(self.backlog)))]
+        self.emitted += len(jobs)
+        return jobs
+
+    def record_decisions(self, jobs):
+        """Record submit-to-decision latency (wall seconds) for decided replay jobs."""
+        now = self.clock()
+        latencies = [now - job['replay_arrival'] for job in jobs if 'replay_arrival' in job]
+        self.latencies.extend(latencies)
+        self.decided += len(latencies)
+        return latencies
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        def pct(q):
+            if not latencies:
+                return None
+            return latencies[max(0, math.ceil(q * len(latencies)) - 1)]
+        elapsed = self.clock() - self.wall_start if self.wall_start is not None else 0.0
+        return {
+            'time_warp': self.time_warp,
+            'elapsed_sec': elapsed,
+            'trace_jobs': len(self.jobs),
+            'arrived': self.idx,
+            'emitted': self.emitted,
+            'decided': self.decided,
+            'backlog': len(self.backlog),
+            'dropped_jobs': self.dropped_jobs,
+            'dropped_cycles': self.dropped_cycles,
+            'polls': self.polls,
+            'finished': self.finished,
+            'arrival_rate_per_sec': self.idx / elapsed if elapsed else 0.0,
+            'decision_rate_per_sec': self.decided / elapsed if elapsed else 0.0,
+            'decision_latency_p50_sec': pct(0.50),
+            'decision_latency_p95_sec': pct(0.95),
+            'decision_latency_p99_sec': pct(0.99),
+            'decision_latency_max_sec': latencies[-1] if latencies else None,
+        }
+
+# Global feeder instance, loaded on first poll so importing this module does not parse the trace
+swf_feeder = None
+
+def get_swf_feeder():
+    global swf_feeder
+    if swf_feeder is None:
+        swf_feeder = SWFJobFeeder(SWF_PATH)
+    return swf_feeder
+
+# Active trace replay, if any (see start_replay)
+replay_feeder = None
+
+def start_replay(time_warp=None, max_jobs_per_poll=None, max_backlog=None, tick_sec=None):
+    global replay_feeder
+    replay_config = config.get('replay') or {}
+    replay_feeder = TraceReplayFeeder(
+        get_swf_feeder().jobs,
+        time_warp=time_warp or replay_config.get('time_warp', 1.0),
+        max_jobs_per_poll=max_jobs_per_poll or replay_config.get('max_jobs_per_poll', 100),
+        max_backlog=max_backlog or replay_config.get('max_backlog', 1000),
+        tick_sec=tick_sec or replay_config.get('tick_sec'),
+    )
+    logger.info(f"Trace replay started at {replay_feeder.time_warp}x over {len(replay_feeder.jobs)} jobs")
+    return replay_feeder
+
+def stop_replay():
+    global replay_feeder
+    feeder, replay_feeder = replay_feeder, None
+    return feeder
+
+# Real SLURM adapter, created on first poll when use_mock_slurm is false
+slurm_adapter = None
+
+def get_slurm_adapter():
+    global slurm_adapter
+    if slurm_adapter is None:
+        slurm_config = config.get('slurm') or {}
+        slurm_adapter = SlurmAdapter(
+            squeue_cmd=slurm_config.get('squeue_cmd', 'squeue'),
+            sacct_cmd=slurm_config.get('sacct_cmd', 'sacct'),
+            timeout=slurm_config.get('timeout_sec', 10),
+            resync_every=slurm_config.get('resync_every', 12),
+            overlap_sec=slurm_config.get('overlap_sec', 5),
+        )
+    return slurm_adapter
 
 # NOTE: The predictors expect a 6-feature input vector. We'll use req_cpus, req_mem_gb, feature3-6.
 def poll_slurm():
+    if replay_feeder is not None:
+        return replay_feeder.get_next_jobs()
+    if not USE_MOCK:
+        # Only new and changed jobs are returned; unchanged jobs keep their stored decisions. They are in any
+        # state, and only the PENDING ones are for the scheduler.
+        # The caller must call commit_poll() once they are stored, or they are returned again.
+        return get_slurm_adapter().poll_sync().jobs
     # Use SWF feeder to mock jobs
-    jobs = swf_feeder.get_next_jobs(5)
+    jobs = get_swf_feeder().get_next_jobs(POLL_BATCH_SIZE)
     logging.getLogger("slurm_poller").info(f"Mock SWF: Returning {len(jobs)} jobs from SWF dataset")
     return jobs
 
+def commit_poll():
+    """Acknowledge that the jobs from the last poll_slurm() were stored."""
+    if slurm_adapter is not None:
+        slurm_adapter.commit()
+
 if __name__ == "__main__":
     while True:
         jobs = poll_slurm()
         print(json.dumps(jobs, indent=2))
+        commit_poll()
         time.sleep(5)
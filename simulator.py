@@ -4,7 +4,7 @@
 import os
 import sys
 import time
-from services.slurm_poller import poll_slurm
+from services.slurm_poller import poll_slurm, commit_poll
 from services.cpu_predictor import CPUPredictor
 from services.mem_predictor import MemPredictor
 from services.rl_scheduler import RLScheduler
@@ -17,7 +17,8 @@ def simulate_and_connect():
 
     # Simulate a batch of jobs through the full pipeline
     for _ in range(3):  # Simulate 3 batches
-        jobs = poll_slurm()
+        # Started and finished jobs from a real cluster are not scheduled
+        jobs = [job for job in poll_slurm() if job.get('state') == 'PENDING']
         # Predict resources
         for job in jobs:
             job = cpu_predictor.predict(job)
@@ -30,6 +31,7 @@ def simulate_and_connect():
         for job in jobs:
             print(job)
         print("Simulated cluster metrics:", metrics)
+        commit_poll()
         print("-"*40)
         time.sleep(2)
 
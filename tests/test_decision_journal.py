@@ -0,0 +1,114 @@
+# test_decision_journal.py
+# Rollup folding, rollup upserts and flush retries of services/decision_journal.py on in-memory SQLite.
+import datetime
+import os
+import sys
+import time
+
+import pytest
+
+pytest.importorskip('sqlalchemy')
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
+from db.db_models import Base, Decision, DecisionRollup
+from services.decision_journal import DecisionJournal, aggregate
+
+T0 = datetime.datetime(2024, 3, 10, 8, 59, 30)
+
+def row(action, seconds, pre_util, post_util, wait_time=None, cycle_util=None):
+    return {'job_id': seconds, 'action': action, 'timestamp': T0 + datetime.timedelta(seconds=seconds),
+            'pre_util': pre_util, 'post_util': post_util, 'wait_time': wait_time, 'cycle_util': cycle_util}
+
+@pytest.fixture
+def session_factory():
+    # One shared connection so the journal's writer thread sees the same in-memory DB
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+def rollups(session_factory):
+    session = session_factory()
+    result = {(r.granularity, r.bucket_start): r for r in session.query(DecisionRollup)}
+    session.close()
+    return result
+
+def test_aggregate_buckets_by_minute_and_hour():
+    rows = [
+        row('RUN', 0, 0.0, 0.25, wait_time=2.0),
+        row('HOLD', 10, 0.25, 0.25, wait_time=2.0, cycle_util=0.25),
+        # Next minute and next hour
+        row('RUN', 40, 0.0, 0.5, cycle_util=0.5),
+    ]
+    buckets = aggregate(rows)
+    assert set(buckets) == {
+        ('minute', datetime.datetime(2024, 3, 10, 8, 59)), ('minute', datetime.datetime(2024, 3, 10, 9, 0)),
+        ('hour', datetime.datetime(2024, 3, 10, 8)), ('hour', datetime.datetime(2024, 3, 10, 9)),
+    }
+    first = buckets[('minute', datetime.datetime(2024, 3, 10, 8, 59))]
+    assert first == {'decisions': 2, 'run_count': 1, 'hold_count': 1, 'pre_util_sum': 0.25,
+                     'post_util_sum': 0.5, 'wait_time_sum': 4.0, 'cycles': 1, 'cycle_util_sum': 0.25}
+    second = buckets[('hour', datetime.datetime(2024, 3, 10, 9))]
+    assert (second['decisions'], second['run_count'], second['cycles'], second['cycle_util_sum']) == (1, 1, 1, 0.5)
+
+def test_aggregate_overrides_add_no_cycles():
+    buckets = aggregate([row('RUN', 0, 0.1, 0.9), row(None, 1, None, None)])
+    agg = buckets[('minute', datetime.datetime(2024, 3, 10, 8, 59))]
+    assert agg['decisions'] == 2 and agg['run_count'] == 1 and agg['hold_count'] == 0
+    assert agg['cycles'] == 0 and agg['post_util_sum'] == 0.9
+
+def test_record_cycle_rolls_up_the_cycles_utilization():
+    journal = DecisionJournal(None)
+    # Five 8-CPU RUNs on the 64-CPU simulated cluster: running totals 0.125..0.625
+    jobs = [{'job_id': i, 'rl_action': 'RUN', 'state': 'PENDING', 'pred_cpu_cores': 8, 'pred_mem_gb': 1.0}
+            for i in range(5)]
+    journal.record_cycle(jobs, {'utilization': 0.625, 'avg_wait_time': 0}, timestamp=T0)
+    rows = [journal.queue.get_nowait() for _ in range(5)]
+    assert [r['post_util'] for r in rows] == [0.125, 0.25, 0.375, 0.5, 0.625]
+    assert [r['cycle_util'] for r in rows] == [None, None, None, None, 0.625]
+    agg = aggregate(rows)[('minute', datetime.datetime(2024, 3, 10, 8, 59))]
+    assert agg['cycle_util_sum'] / agg['cycles'] == 0.625
+
+def test_flush_adds_to_existing_rollups(session_factory):
+    journal = DecisionJournal(session_factory)
+    assert journal.flush([row('RUN', 0, 0.0, 0.5, cycle_util=0.5)])
+    assert journal.flush([row('HOLD', 5, 0.5, 0.5, cycle_util=0.25), row('RUN', 40, 0.0, 0.125)])
+    result = rollups(session_factory)
+    minute = result[('minute', datetime.datetime(2024, 3, 10, 8, 59))]
+    assert (minute.decisions, minute.run_count, minute.hold_count) == (2, 1, 1)
+    assert (minute.cycles, minute.cycle_util_sum, minute.post_util_sum) == (2, 0.75, 1.0)
+    hour = result[('hour', datetime.datetime(2024, 3, 10, 8))]
+    assert (hour.decisions, hour.cycles) == (2, 2)
+    assert result[('hour', datetime.datetime(2024, 3, 10, 9))].decisions == 1
+    session = session_factory()
+    assert session.query(Decision).count() == 3
+    session.close()
+
+def test_failed_flush_is_retried(session_factory):
+    attempts = []
+
+    def flaky_sessions():
+        session = session_factory()
+        attempts.append(session)
+        if len(attempts) == 1:
+            def locked():
+                raise OperationalError('COMMIT', {}, Exception('database is locked'))
+            session.commit = locked
+        return session
+
+    journal = DecisionJournal(flaky_sessions, flush_interval=0.01)
+    journal.start()
+    journal.record(1, 'RUN', T0, 0.0, 0.5, cycle_util=0.5)
+    journal.record(2, 'HOLD', T0, 0.5, 0.5)
+    deadline = time.monotonic() + 5.0
+    while len(attempts) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    journal.stop()
+    assert len(attempts) == 2
+    session = session_factory()
+    assert sorted(d.job_id for d in session.query(Decision)) == [1, 2]
+    session.close()
+    assert rollups(session_factory)[('minute', datetime.datetime(2024, 3, 10, 8, 59))].decisions == 2
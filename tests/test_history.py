@@ -0,0 +1,53 @@
+# test_history.py
+# /history bound parsing and auto granularity (services/history.py).
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
+from services.history import history_bounds, history_granularity
+
+NOW = datetime.datetime(2024, 3, 10, 12, 0)
+
+def test_bounds_parse_iso_timestamps():
+    start, end = history_bounds('2024-03-10T08:00:00', '2024-03-10T09:30:00')
+    assert start == datetime.datetime(2024, 3, 10, 8, 0)
+    assert end == datetime.datetime(2024, 3, 10, 9, 30)
+
+def test_date_only_end_covers_the_whole_day():
+    start, end = history_bounds('2024-03-10', '2024-03-10')
+    assert start == datetime.datetime(2024, 3, 10)
+    assert end == datetime.datetime(2024, 3, 10, 23, 59, 59, 999999)
+
+def test_open_bounds():
+    assert history_bounds(None, None) == (None, None)
+    assert history_bounds('', '') == (None, None)
+
+def test_invalid_bounds_raise():
+    with pytest.raises(ValueError):
+        history_bounds('yesterday', None)
+    with pytest.raises(ValueError):
+        history_bounds(None, '2024-13-01')
+
+@pytest.mark.parametrize('span, expected', [
+    (datetime.timedelta(hours=1), 'raw'),
+    (datetime.timedelta(hours=6), 'raw'),
+    (datetime.timedelta(hours=6, seconds=1), 'minute'),
+    (datetime.timedelta(days=7), 'minute'),
+    (datetime.timedelta(days=8), 'hour'),
+])
+def test_granularity_by_span(span, expected):
+    assert history_granularity(NOW - span, NOW) == expected
+
+def test_granularity_open_range():
+    assert history_granularity(None, NOW) == 'hour'
+    # An open end runs to now
+    assert history_granularity(NOW - datetime.timedelta(hours=2), None, now=NOW) == 'raw'
+    assert history_granularity(NOW - datetime.timedelta(days=2), None, now=NOW) == 'minute'
+
+def test_dashboard_default_range_uses_minute_buckets():
+    # The dashboard asks for today..today; the date-only end stretches the span to a full day
+    start, end = history_bounds('2024-03-10', '2024-03-10')
+    assert history_granularity(start, end) == 'minute'
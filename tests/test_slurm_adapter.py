@@ -0,0 +1,125 @@
+# test_slurm_adapter.py
+# Exercises services/slurm_adapter.py against tools/fake_slurm.py replaying a small hand-written trace.
+# Trace time 1000 is pinned to wall-clock EPOCH via FAKE_SLURM_EPOCH and the trace runs at warp 1, so
+# polling at EPOCH + s sees the cluster at trace time 1000 + s. No test sleeps.
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
+from services.slurm_adapter import SlurmAdapter, SlurmCommandError
+
+FAKE_SLURM = os.path.join(os.path.dirname(__file__), '../tools/fake_slurm.py')
+EPOCH = 1700000000
+
+# job_id submit wait run procs avg_cpu mem req_procs req_time req_mem status uid gid exe queue partition prev think
+TRACE = """\
+; job 1 runs 1000-1100, job 2 pends until 1050 then runs past the end of the tests,
+; job 3 pends until 1130 and runs until 1180, job 4 is submitted and finishes between two polls
+1 1000 0 100 4 -1 -1 4 600 2048 1 1 1 -1 1 1 -1 -1
+2 1000 50 1000 8 -1 -1 8 3600 4096 1 2 1 -1 1 1 -1 -1
+3 1030 100 50 2 -1 -1 2 600 1024 1 3 1 -1 1 2 -1 -1
+4 1200 0 30 1 -1 -1 1 60 512 1 1 1 -1 1 1 -1 -1
+"""
+
+class FakeCluster:
+    def __init__(self, trace_path):
+        self.trace_path = trace_path
+        self.now = EPOCH
+
+    def command(self, *extra):
+        return [sys.executable, FAKE_SLURM, '--trace', self.trace_path, *extra]
+
+    def adapter(self, **kwargs):
+        kwargs.setdefault('resync_every', 2)
+        kwargs.setdefault('overlap_sec', 0)
+        return SlurmAdapter(self.command('squeue'), self.command('sacct'), clock=lambda: self.now, **kwargs)
+
+    def poll(self, adapter, offset):
+        # squeue answers for the adapter's clock; sacct already gets its window from it
+        self.now = EPOCH + offset
+        adapter.squeue_cmd = self.command('--now', str(self.now), 'squeue')
+        return adapter.poll_sync()
+
+@pytest.fixture
+def cluster(tmp_path, monkeypatch):
+    trace_path = tmp_path / 'trace.swf'
+    trace_path.write_text(TRACE)
+    monkeypatch.setenv('FAKE_SLURM_EPOCH', str(EPOCH))
+    return FakeCluster(str(trace_path))
+
+def states(jobs):
+    return {job['job_id']: job['state'] for job in jobs}
+
+def test_deltas_and_resync(cluster):
+    adapter = cluster.adapter()
+
+    changes = cluster.poll(adapter, 10)
+    assert changes.full_sync
+    assert states(changes.added) == {1: 'RUNNING', 2: 'PENDING'}
+    adapter.commit()
+
+    changes = cluster.poll(adapter, 60)
+    assert not changes.full_sync
+    assert states(changes.added) == {3: 'PENDING'}
+    # Job 3 comes from the sacct delta, which reports its submit time as time.submission
+    assert changes.added[0]['submit_time'] == EPOCH + 30
+    assert [(old, job['job_id'], job['state']) for old, job in changes.changed] == [('PENDING', 2, 'RUNNING')]
+    assert changes.finished == []
+    adapter.commit()
+
+    changes = cluster.poll(adapter, 150)
+    assert states(changes.jobs) == {1: 'COMPLETED', 3: 'RUNNING'}
+    assert states(changes.finished) == {1: 'COMPLETED'}
+    assert len(changes) == 2
+    adapter.commit()
+    assert set(adapter.known) == {2, 3}
+
+    # Resync: job 3 ended after the last delta and is no longer in squeue; job 4 came and went unseen
+    changes = cluster.poll(adapter, 250)
+    assert changes.full_sync
+    assert changes.added == []
+    assert states(changes.finished) == {3: 'COMPLETED'}
+    assert states(changes.jobs) == {3: 'COMPLETED'}
+    adapter.commit()
+    assert set(adapter.known) == {2}
+
+def test_uncommitted_changes_are_delivered_again(cluster):
+    adapter = cluster.adapter()
+    first = cluster.poll(adapter, 10)
+    assert adapter.cursor is None and adapter.known == {}
+
+    # The pipeline failed to store the first batch, so the next poll starts from scratch
+    again = cluster.poll(adapter, 60)
+    assert again.full_sync
+    assert states(again.added) == {1: 'RUNNING', 2: 'RUNNING', 3: 'PENDING'}
+    adapter.commit(again)
+    assert adapter.cursor == EPOCH + 60
+    assert set(states(first.added)) < set(adapter.known)
+
+def test_cursor_does_not_advance_on_command_failure(cluster):
+    adapter = cluster.adapter()
+    cluster.poll(adapter, 10)
+    adapter.commit()
+    cursor, known = adapter.cursor, dict(adapter.known)
+
+    sacct_cmd = adapter.sacct_cmd
+    adapter.sacct_cmd = [sys.executable, '-c', 'import sys; sys.exit(3)']
+    with pytest.raises(SlurmCommandError, match='exited with 3'):
+        cluster.poll(adapter, 60)
+    assert adapter.cursor == cursor
+    assert adapter.known == known
+    assert adapter.uncommitted is None
+
+    # The next successful poll covers the failed window
+    adapter.sacct_cmd = sacct_cmd
+    changes = cluster.poll(adapter, 150)
+    assert states(changes.jobs) == {1: 'COMPLETED', 2: 'RUNNING', 3: 'RUNNING'}
+
+def test_timeout(cluster):
+    adapter = cluster.adapter(timeout=0.5)
+    adapter.squeue_cmd = cluster.command('--delay', '5', 'squeue')
+    with pytest.raises(SlurmCommandError, match='timed out'):
+        adapter.poll_sync()
+    assert adapter.cursor is None
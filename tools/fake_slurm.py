@@ -0,0 +1,138 @@
+# fake_slurm.py
+# Local stand-in for `squeue --json` / `sacct --json` that replays an SWF trace, for exercising
+# services/slurm_adapter.py without a cluster.
+#
+# The trace's first submit time is mapped to --epoch (wall clock, defaults to the first invocation)
+# and trace time advances --warp times faster than the wall clock. Each job is PENDING from submit
+# until submit + wait, RUNNING until it has run for its run time, then COMPLETED.
+#
+#   python tools/fake_slurm.py --trace t.swf --warp 100 squeue --json --states=PENDING,RUNNING
+#   python tools/fake_slurm.py --trace t.swf --warp 100 sacct --json --starttime 2026-01-01T00:00:00 --endtime now
+#
+# Point the adapter at it via config/service_config.yaml:
+#   use_mock_slurm: false
+#   slurm:
+#     squeue_cmd: "python tools/fake_slurm.py --trace data/synthetic.swf --warp 100 squeue"
+#     sacct_cmd: "python tools/fake_slurm.py --trace data/synthetic.swf --warp 100 sacct"
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+def load_trace(path):
+    jobs = []
+    with open(path) as f:
+        for line in f:
+            if line.startswith(';') or not line.strip():
+                continue
+            fields = line.split()
+            if len(fields) < 18:
+                continue
+            submit, wait, run = int(fields[1]), max(0, int(fields[2])), max(1, int(fields[3]))
+            procs = int(fields[7]) if fields[7] != '-1' else max(1, int(fields[4]))
+            req_time = int(fields[8]) if fields[8] != '-1' else run
+            req_mem = float(fields[9]) if fields[9] != '-1' else 1024.0
+            user_id = int(fields[11]) if fields[11] != '-1' else 0
+            partition = int(fields[15]) if fields[15] != '-1' else 0
+            jobs.append({
+                'job_id': int(fields[0]), 'submit': submit, 'start': submit + wait, 'end': submit + wait + run,
+                'cpus': procs, 'mem_mb': req_mem, 'limit_min': max(1, req_time // 60),
+                'user_id': user_id, 'partition': f"part{partition}",
+            })
+    return jobs
+
+def resolve_epoch(args):
+    if args.epoch is not None:
+        return args.epoch
+    if os.environ.get('FAKE_SLURM_EPOCH'):
+        return float(os.environ['FAKE_SLURM_EPOCH'])
+    # Remember the first invocation so successive calls see a consistent clock
+    state_path = args.trace + '.fake_slurm_epoch'
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            return float(f.read().strip())
+    epoch = time.time()
+    with open(state_path, 'w') as f:
+        f.write(str(epoch))
+    return epoch
+
+def parse_time(value):
+    if value in (None, 'now'):
+        return time.time()
+    return datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S').timestamp()
+
+def state_at(job, t):
+    if t < job['start']:
+        return 'PENDING'
+    if t < job['end']:
+        return 'RUNNING'
+    return 'COMPLETED'
+
+def _num(n):
+    return {'set': True, 'infinite': False, 'number': n}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake squeue/sacct replaying an SWF trace")
+    parser.add_argument('--trace', required=True)
+    parser.add_argument('--epoch', type=float, help="Wall-clock time that maps to the trace's first submit")
+    parser.add_argument('--warp', type=float, default=1.0)
+    parser.add_argument('--delay', type=float, default=0.0, help="Sleep before answering (to exercise timeouts)")
+    parser.add_argument('--now', type=float, help="Wall-clock time squeue answers for (default: the current time)")
+    parser.add_argument('command', choices=['squeue', 'sacct'])
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--states', default=None)
+    parser.add_argument('--starttime', '-S', default=None)
+    parser.add_argument('--endtime', '-E', default=None)
+    parser.add_argument('--allocations', '-X', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not args.json:
+        print("fake_slurm only supports --json output", file=sys.stderr)
+        return 2
+    if args.delay:
+        time.sleep(args.delay)
+
+    jobs = load_trace(args.trace)
+    if not jobs:
+        print(json.dumps({'jobs': []}))
+        return 0
+    epoch = resolve_epoch(args)
+    trace_start = min(j['submit'] for j in jobs)
+    to_trace = lambda wall: trace_start + (wall - epoch) * args.warp
+    to_wall = lambda t: epoch + (t - trace_start) / args.warp
+
+    out = []
+    if args.command == 'squeue':
+        now = to_trace(args.now if args.now is not None else time.time())
+        states = set(args.states.split(',')) if args.states else {'PENDING', 'RUNNING'}
+        for job in jobs:
+            if job['submit'] > now:
+                continue
+            state = state_at(job, now)
+            if state not in states:
+                continue
+            out.append({
+                'job_id': job['job_id'], 'user_id': job['user_id'], 'user_name': f"user{job['user_id']}",
+                'partition': job['partition'], 'job_state': [state], 'cpus': _num(job['cpus']),
+                'memory_per_node': _num(int(job['mem_mb'])), 'time_limit': _num(job['limit_min']),
+                'submit_time': _num(int(to_wall(job['submit']))),
+            })
+    else:
+        since, until = to_trace(parse_time(args.starttime)), to_trace(parse_time(args.endtime))
+        for job in jobs:
+            # Report jobs with a submit/start/end event inside the window, in their state at its end
+            if job['submit'] > until or not any(since <= t <= until for t in (job['submit'], job['start'], job['end'])):
+                continue
+            out.append({
+                'job_id': job['job_id'], 'user': f"user{job['user_id']}", 'partition': job['partition'],
+                'state': {'current': [state_at(job, until)], 'reason': 'None'},
+                'required': {'CPUs': job['cpus'], 'memory_per_node': _num(int(job['mem_mb']))},
+                'time': {'submission': int(to_wall(job['submit'])), 'limit': _num(job['limit_min'])},
+            })
+    print(json.dumps({'jobs': out}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())